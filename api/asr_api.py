@@ -9,11 +9,35 @@
 - iic/SenseVoiceSmall（备选）
 """
 import requests
-import base64
-from typing import Optional, Union
+try:
+    # 可选依赖pybase64（SIMD加速），未安装时使用标准库
+    import pybase64 as base64
+except ImportError:
+    import base64
+import asyncio
+import hashlib
+import tempfile
+from types import MappingProxyType
+from functools import lru_cache
+from typing import BinaryIO, Optional, Tuple, Union
 from pathlib import Path
 from loguru import logger
 from config.settings import settings
+from api.cache import LRUCache
+
+# 流式读写音频时的分块大小
+_CHUNK_SIZE = 64 * 1024
+# 下载的网络音频超过该大小后从内存转存到磁盘临时文件
+_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+# 本地音频扩展名到MIME类型的映射（只读）
+_ASR_MIME_TYPES = MappingProxyType({
+    '.mp3': 'audio/mpeg',
+    '.wav': 'audio/wav',
+    '.m4a': 'audio/m4a',
+    '.flac': 'audio/flac',
+    '.ogg': 'audio/ogg',
+    '.webm': 'audio/webm'
+})
 
 
 class ASRAPI:
@@ -46,12 +70,53 @@ class ASRAPI:
         """
         self.base_url = settings.SILICONFLOW_BASE_URL
         self.model = settings.SPEECH_MODEL
-        self.headers = {
-            "Authorization": f"Bearer {settings.SILICONFLOW_API_KEY}"
-        }
+        # multipart上传只带鉴权头，Content-Type交给requests生成（含boundary）
+        self.headers = settings.headers_auth_only
+        # 使用全局共享的HTTP会话（连接池），避免每次请求重新建立TCP+TLS连接
+        self.session = settings.http
+        # 识别结果缓存：按音频内容哈希，相同音频不再重复上传识别
+        self.cache = LRUCache(maxsize=settings.ASR_CACHE_SIZE)
         
         logger.info(f"ASR API 初始化: {self.model}")
     
+    @staticmethod
+    def _audio_hash(audio_data: bytes) -> str:
+        """计算音频内容的哈希值，用作缓存键"""
+        return hashlib.blake2b(audio_data, digest_size=16).hexdigest()
+    
+    @staticmethod
+    def _file_hash(audio_file: BinaryIO) -> str:
+        """分块计算已打开音频文件的哈希值，计算完成后回到文件开头"""
+        hasher = hashlib.blake2b(digest_size=16)
+        for chunk in iter(lambda: audio_file.read(_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+        audio_file.seek(0)
+        return hasher.hexdigest()
+    
+    def _download_audio(self, url: str) -> Tuple[BinaryIO, str]:
+        """
+        流式下载网络音频到临时文件，边下载边计算哈希
+        
+        小文件留在内存中，超过阈值自动落盘，避免下载过程中大音频整体缓冲在内存里
+        （上传时 requests 的 files= 仍会读出全部内容，在内存中组装multipart请求体）
+        
+        Returns:
+            (临时文件对象, 音频哈希)，调用方负责关闭临时文件
+        """
+        hasher = hashlib.blake2b(digest_size=16)
+        tmp = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE)
+        try:
+            with self.session.get(url, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
+                    tmp.write(chunk)
+                    hasher.update(chunk)
+            tmp.seek(0)
+            return tmp, hasher.hexdigest()
+        except Exception:
+            tmp.close()
+            raise
+    
     def encode_audio_to_base64(self, audio_path: str) -> str:
         """
         将本地音频文件编码为Base64
@@ -66,7 +131,7 @@ class ASRAPI:
             with open(audio_path, "rb") as audio_file:
                 audio_data = audio_file.read()
             
-            base64_audio = base64.b64encode(audio_data).decode('utf-8')
+            base64_audio = base64.b64encode(audio_data).decode('ascii')
             logger.info(f"音频已编码，大小: {len(audio_data)} 字节")
             return base64_audio
             
@@ -113,20 +178,21 @@ class ASRAPI:
             >>> # 指定语言
             >>> text = asr_api.transcribe("audio.mp3", language="zh")
         """
+        audio_handle = None
         try:
             # 1. 处理音频数据
             if isinstance(audio_source, bytes):
                 # 二进制数据，直接编码
                 logger.info("使用二进制音频数据")
                 audio_file = ("audio.wav", audio_source, "audio/wav")
+                audio_hash = self._audio_hash(audio_source)
                 
             elif isinstance(audio_source, str) and audio_source.startswith(('http://', 'https://')):
                 # 网络音频URL
                 logger.info(f"使用音频URL: {audio_source[:50]}...")
-                # 先下载音频
-                response = requests.get(audio_source, timeout=30)
-                response.raise_for_status()
-                audio_file = ("audio.mp3", response.content, "audio/mpeg")
+                # 先流式下载音频到临时文件
+                audio_handle, audio_hash = self._download_audio(audio_source)
+                audio_file = ("audio.mp3", audio_handle, "audio/mpeg")
                 
             elif isinstance(audio_source, str) and Path(audio_source).exists():
                 # 本地文件路径
@@ -134,25 +200,24 @@ class ASRAPI:
                 
                 # 检测文件格式
                 file_ext = Path(audio_source).suffix.lower()
-                mime_types = {
-                    '.mp3': 'audio/mpeg',
-                    '.wav': 'audio/wav',
-                    '.m4a': 'audio/m4a',
-                    '.flac': 'audio/flac',
-                    '.ogg': 'audio/ogg',
-                    '.webm': 'audio/webm'
-                }
-                mime_type = mime_types.get(file_ext, 'audio/mpeg')
-                
-                # 读取文件
-                with open(audio_source, 'rb') as f:
-                    audio_data = f.read()
+                mime_type = _ASR_MIME_TYPES.get(file_ext, 'audio/mpeg')
                 
-                audio_file = (Path(audio_source).name, audio_data, mime_type)
+                # 传入文件句柄，分块计算哈希，命中缓存时不必读入整个文件；
+                # 需要上传时 requests 的 files= 仍会 read() 全部内容，在内存中组装multipart请求体
+                audio_handle = open(audio_source, 'rb')
+                audio_hash = self._file_hash(audio_handle)
+                audio_file = (Path(audio_source).name, audio_handle, mime_type)
                 
             else:
                 raise ValueError(f"无效的音频来源: {audio_source}")
             
+            # 先查缓存，相同音频+参数直接返回
+            cache_key = ("transcribe", self.model, audio_hash, language, response_format)
+            cached_text = self.cache.get(cache_key)
+            if cached_text is not None:
+                logger.info(f"ASR命中缓存，文本长度: {len(cached_text)}")
+                return cached_text
+            
             # 2. 构建请求
             url = f"{self.base_url}/audio/transcriptions"
             
@@ -176,7 +241,7 @@ class ASRAPI:
             logger.info(f"语言设置: {language}")
             
             # 3. 发送请求
-            response = requests.post(
+            response = self.session.post(
                 url,
                 headers=self.headers,
                 files=files,
@@ -195,6 +260,7 @@ class ASRAPI:
                 text = result.get('text', '')
             
             logger.info(f"ASR识别成功，文本长度: {len(text)}")
+            self.cache.put(cache_key, text)
             return text
             
         except requests.exceptions.Timeout:
@@ -215,6 +281,22 @@ class ASRAPI:
             error_msg = f"ASR处理失败: {str(e)}"
             logger.error(error_msg)
             raise Exception(error_msg)
+        finally:
+            if audio_handle is not None:
+                audio_handle.close()
+    
+    async def atranscribe(
+        self,
+        audio_source: Union[str, bytes],
+        language: Optional[str] = "auto",
+        response_format: str = "json"
+    ) -> str:
+        """
+        transcribe 的异步版本：上传和识别在线程中进行，不阻塞事件循环
+        
+        参数、返回值和异常与 transcribe 相同
+        """
+        return await asyncio.to_thread(self.transcribe, audio_source, language, response_format)
     
     def transcribe_with_timestamps(
         self,
@@ -238,18 +320,25 @@ class ASRAPI:
                     ]
                 }
         """
+        audio_handle = None
         try:
             # 使用 verbose_json 格式获取详细信息
             url = f"{self.base_url}/audio/transcriptions"
             
             # 处理音频文件
             if isinstance(audio_source, str) and Path(audio_source).exists():
-                with open(audio_source, 'rb') as f:
-                    audio_data = f.read()
-                audio_file = (Path(audio_source).name, audio_data, 'audio/mpeg')
+                audio_handle = open(audio_source, 'rb')
+                audio_file = (Path(audio_source).name, audio_handle, 'audio/mpeg')
             else:
                 raise ValueError("时间戳功能需要本地音频文件")
             
+            # 带时间戳的结果单独缓存（与纯文本结果分开）
+            cache_key = ("timestamps", self.model, self._file_hash(audio_handle), language)
+            cached_result = self.cache.get(cache_key)
+            if cached_result is not None:
+                logger.info("ASR命中缓存（含时间戳）")
+                return cached_result
+            
             files = {'file': audio_file}
             data = {
                 'model': self.model,
@@ -259,7 +348,7 @@ class ASRAPI:
             if language and language != "auto":
                 data['language'] = language
             
-            response = requests.post(
+            response = self.session.post(
                 url,
                 headers=self.headers,
                 files=files,
@@ -271,15 +360,28 @@ class ASRAPI:
             result = response.json()
             
             logger.info("ASR识别成功（含时间戳）")
+            self.cache.put(cache_key, result)
             return result
             
         except Exception as e:
             logger.error(f"带时间戳的ASR识别失败: {str(e)}")
             raise
+        finally:
+            if audio_handle is not None:
+                audio_handle.close()
 
 
-# 创建全局实例，方便其他模块直接导入使用
-asr_api = ASRAPI()
+@lru_cache(maxsize=None)
+def get_asr_api() -> ASRAPI:
+    """获取全局ASR实例，首次调用时才创建"""
+    return ASRAPI()
+
+
+def __getattr__(name: str):
+    # PEP 562：`from api.asr_api import asr_api` 用法不变，但导入模块时不再立即创建实例
+    if name == "asr_api":
+        return get_asr_api()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # 示例代码（仅用于测试）
@@ -288,6 +390,8 @@ if __name__ == "__main__":
     测试ASR API功能
     运行方式: python -m api.asr_api
     """
+    asr_api = get_asr_api()
+    
     try:
         # 测试语音识别
         test_audio = "test_audio.mp3"
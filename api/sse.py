@@ -0,0 +1,53 @@
+"""
+SSE (Server-Sent Events) 流解析工具
+
+用于解析 OpenAI 兼容接口 stream=True 时返回的事件流
+"""
+from typing import Generator, Iterable, Optional
+
+
+def iter_sse_data(chunks: Iterable[bytes]) -> Generator[bytes, None, None]:
+    """
+    将原始字节块切分为SSE事件，逐个产出事件的 data 内容
+
+    事件之间以空行分隔，按大块读取后在缓冲区里切分，
+    比逐行迭代的Python层循环次数少得多。
+
+    Args:
+        chunks: 响应字节块，如 response.iter_content(chunk_size=8192)
+
+    Yields:
+        bytes: 每个事件的 data 字段（多行 data 以换行拼接），如 b'[DONE]'
+    """
+    buffer = bytearray()
+    for chunk in chunks:
+        # 统一换行符，\r 不会出现在JSON数据本身中
+        buffer += chunk.replace(b"\r", b"")
+        start = 0
+        while True:
+            end = buffer.find(b"\n\n", start)
+            if end == -1:
+                break
+            data = _event_data(bytes(buffer[start:end]))
+            start = end + 2
+            if data is not None:
+                yield data
+        del buffer[:start]
+
+    # 流结束时可能还有一个未以空行结尾的事件
+    if buffer:
+        data = _event_data(bytes(buffer))
+        if data is not None:
+            yield data
+
+
+def _event_data(event: bytes) -> Optional[bytes]:
+    """提取单个事件中的 data 字段，没有 data 字段（如注释、心跳）时返回 None"""
+    data_lines = [
+        line[5:].lstrip(b" ")
+        for line in event.split(b"\n")
+        if line.startswith(b"data:")
+    ]
+    if not data_lines:
+        return None
+    return b"\n".join(data_lines)
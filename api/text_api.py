@@ -1,10 +1,16 @@
 """
 文本对话API - 调用硅基流动LLM模型
 """
-import requests
-from typing import Optional, Dict, Any, Generator
+import asyncio
+import hashlib
+import json
+import orjson
+from functools import lru_cache
+from typing import Optional, Dict, Any, Generator, Iterable
 from loguru import logger
 from config.settings import settings
+from api.cache import LRUCache
+from api.sse import iter_sse_data
 
 
 class TextAPI:
@@ -13,7 +19,27 @@ class TextAPI:
     def __init__(self):
         self.base_url = settings.SILICONFLOW_BASE_URL
         self.model = settings.TEXT_MODEL
-        self.headers = settings.get_headers()
+        self.headers = settings.headers_json
+        # 请求中不变的部分只构建一次，每次调用只需补上 messages/stream
+        self.chat_url = f"{self.base_url}/chat/completions"
+        self._base_payload = {
+            "model": self.model,
+            "max_tokens": settings.MAX_TOKENS,
+            "temperature": settings.TEMPERATURE
+        }
+        # 使用全局共享的HTTP会话（连接池），避免每次请求重新建立TCP+TLS连接
+        self.session = settings.http
+        # 回复缓存：相同的对话上下文不再重复调用LLM
+        self.cache = LRUCache(maxsize=settings.CHAT_CACHE_SIZE)
+    
+    def _cache_key(self, messages: list) -> str:
+        """根据模型、采样参数和完整消息列表生成缓存键"""
+        raw = json.dumps(
+            [self.model, settings.MAX_TOKENS, settings.TEMPERATURE, messages],
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
     
     def chat(
         self, 
@@ -42,22 +68,23 @@ class TextAPI:
             
             messages.append({"role": "user", "content": message})
             
+            # 先查缓存，命中则无需请求API
+            cache_key = self._cache_key(messages)
+            cached_reply = self.cache.get(cache_key)
+            if cached_reply is not None:
+                logger.info(f"文本API命中缓存，长度: {len(cached_reply)}")
+                return cached_reply
+            
             # 调用API
-            url = f"{self.base_url}/chat/completions"
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": settings.MAX_TOKENS,
-                "temperature": settings.TEMPERATURE,
-                "stream": stream
-            }
+            payload = {**self._base_payload, "messages": messages, "stream": stream}
             
             logger.info(f"调用文本API: {self.model}")
-            response = requests.post(url, json=payload, headers=self.headers, timeout=60)
+            response = self.session.post(self.chat_url, data=orjson.dumps(payload), headers=self.headers, timeout=60)
             response.raise_for_status()
             
             result = response.json()
             reply = result["choices"][0]["message"]["content"]
+            self.cache.put(cache_key, reply)
             
             logger.info(f"文本API响应成功，长度: {len(reply)}")
             return reply
@@ -66,6 +93,19 @@ class TextAPI:
             logger.error(f"文本API调用失败: {str(e)}")
             return f"❌ 文本API调用失败: {str(e)}"
     
+    async def achat(
+        self,
+        message: str,
+        history: Optional[list] = None
+    ) -> str:
+        """
+        chat 的异步版本，供 asyncio 事件循环中调用
+        
+        阻塞的HTTP请求放到线程中执行，不会卡住事件循环；
+        多个 achat 可以用 asyncio.gather 并发等待。
+        """
+        return await asyncio.to_thread(self.chat, message, history)
+    
     def chat_stream(
         self, 
         message: str, 
@@ -91,20 +131,21 @@ class TextAPI:
             
             messages.append({"role": "user", "content": message})
             
+            # 与 chat 共用回复缓存：相同的对话上下文直接输出缓存的完整回复
+            cache_key = self._cache_key(messages)
+            cached_reply = self.cache.get(cache_key)
+            if cached_reply is not None:
+                logger.info(f"流式文本API命中缓存，长度: {len(cached_reply)}")
+                yield cached_reply
+                return
+            
             # 调用API
-            url = f"{self.base_url}/chat/completions"
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": settings.MAX_TOKENS,
-                "temperature": settings.TEMPERATURE,
-                "stream": True
-            }
+            payload = {**self._base_payload, "messages": messages, "stream": True}
             
             logger.info(f"调用流式文本API: {self.model}")
-            response = requests.post(
-                url, 
-                json=payload, 
+            response = self.session.post(
+                self.chat_url, 
+                data=orjson.dumps(payload), 
                 headers=self.headers, 
                 timeout=60, 
                 stream=True
@@ -112,23 +153,27 @@ class TextAPI:
             response.raise_for_status()
             
             # 流式读取响应
-            for line in response.iter_lines():
-                if line:
-                    line_str = line.decode('utf-8')
-                    if line_str.startswith('data: '):
-                        data = line_str[6:]
-                        if data == '[DONE]':
-                            break
-                        try:
-                            import json
-                            chunk = json.loads(data)
-                            if 'choices' in chunk and len(chunk['choices']) > 0:
-                                delta = chunk['choices'][0].get('delta', {})
-                                content = delta.get('content', '')
-                                if content:
-                                    yield content
-                        except json.JSONDecodeError:
-                            continue
+            # 按8KB大块读取并在字节上切分SSE事件，orjson可直接解析bytes
+            parts = []
+            completed = False
+            for data in iter_sse_data(response.iter_content(chunk_size=8192)):
+                if data == b'[DONE]':
+                    completed = True
+                    break
+                try:
+                    chunk = orjson.loads(data)
+                    if 'choices' in chunk and len(chunk['choices']) > 0:
+                        delta = chunk['choices'][0].get('delta', {})
+                        content = delta.get('content', '')
+                        if content:
+                            parts.append(content)
+                            yield content
+                except orjson.JSONDecodeError:
+                    continue
+            
+            # 只缓存正常结束（收到 [DONE]）的完整回复
+            if completed and parts:
+                self.cache.put(cache_key, "".join(parts))
             
             logger.info("流式文本API响应完成")
             
@@ -137,6 +182,45 @@ class TextAPI:
             yield f"❌ 流式文本API调用失败: {str(e)}"
 
 
-# 创建全局实例
-text_api = TextAPI()
+# 流式输出时遇到这些结尾就立即刷新界面（句末、换行、空格）
+_FLUSH_ENDINGS = ("。", "！", "？", "\n", ".", " ")
+# 没遇到上述结尾时，每累计这么多个片段刷新一次
+_FLUSH_EVERY = 8
+
+
+def accumulate_stream(chunks: Iterable[str]) -> Generator[str, None, None]:
+    """
+    将 chat_stream 的文本片段累积为完整回复，分批产出当前全文
+
+    片段先收集到列表，遇到句子/换行边界或每累计 _FLUSH_EVERY 个片段时才拼接产出一次，
+    避免每个token都重新拼接整段回复、刷新界面；最后一次产出的总是完整回复
+
+    Args:
+        chunks: 流式输出的文本片段，如 text_api.chat_stream(...)
+
+    Yields:
+        str: 截至当前的完整文本
+    """
+    parts = []
+    flushed = 0
+    for chunk in chunks:
+        parts.append(chunk)
+        if chunk.endswith(_FLUSH_ENDINGS) or len(parts) - flushed >= _FLUSH_EVERY:
+            flushed = len(parts)
+            yield "".join(parts)
+    if not parts or flushed != len(parts):
+        yield "".join(parts)
+
+
+@lru_cache(maxsize=None)
+def get_text_api() -> TextAPI:
+    """获取全局文本对话实例，首次调用时才创建"""
+    return TextAPI()
+
+
+def __getattr__(name: str):
+    # PEP 562：`from api.text_api import text_api` 用法不变，但导入模块时不再立即创建实例
+    if name == "text_api":
+        return get_text_api()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
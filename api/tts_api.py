@@ -3,11 +3,55 @@
 将文本转换为语音
 """
 import requests
-import base64
-from typing import Optional
+try:
+    # 优先使用SIMD加速的pybase64
+    import pybase64 as base64
+except ImportError:
+    import base64
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import Path
+from functools import lru_cache
+from typing import Any, BinaryIO, Callable, List, Optional
 from loguru import logger
 from config.settings import settings
 
+# 流式接收和复制音频时的分块大小
+_CHUNK_SIZE = 64 * 1024
+
+# 不超过该大小（字节）的响应视为空音频：连一个WAV文件头都放不下，更不含任何MP3帧
+_MIN_AUDIO_BYTES = 44
+
+# 默认发音人
+_DEFAULT_VOICE = "fnlp/MOSS-TTSD-v0.5:alex"
+
+# 批量合成默认线程池的最大并发请求数
+_BATCH_WORKERS = 8
+
+
+@lru_cache(maxsize=None)
+def _batch_executor() -> ThreadPoolExecutor:
+    """批量合成默认使用的线程池：首次调用时创建，之后每轮对话都复用同一批线程"""
+    return ThreadPoolExecutor(max_workers=_BATCH_WORKERS, thread_name_prefix="tts")
+
+
+def _is_cached(cache_path: Path) -> bool:
+    """缓存文件存在且不是空音频"""
+    try:
+        return cache_path.stat().st_size > _MIN_AUDIO_BYTES
+    except OSError:
+        return False
+
+
+def _copy_file(src_path: str, dst: BinaryIO) -> None:
+    """将文件内容分块复制到已打开的文件对象"""
+    with open(src_path, 'rb') as src:
+        shutil.copyfileobj(src, dst, _CHUNK_SIZE)
+
 
 class TTSAPI:
     """
@@ -30,7 +74,13 @@ class TTSAPI:
         """
         self.base_url = settings.SILICONFLOW_BASE_URL
         self.model = settings.TTS_MODEL
-        self.headers = settings.get_headers()
+        self.headers = settings.headers_json
+        # 使用全局共享的HTTP会话（连接池），避免每次请求重新建立TCP+TLS连接
+        self.session = settings.http
+        # 本地磁盘缓存：相同的 模型+发音人+语速+文本 直接复用已合成的音频，
+        # 总大小超过 TTS_CACHE_MAX_MB 后删除最旧的文件
+        self.cache_dir = Path(settings.AUDIO_OUTPUT_DIR) / "tts_cache"
+        self.cache_max_bytes = settings.TTS_CACHE_MAX_MB * 1024 * 1024
 
     def synthesize(
             self,
@@ -49,11 +99,11 @@ class TTSAPI:
             save_path: 保存音频文件的路径（可选，不传则只返回音频数据）
             
         Returns:
-            bytes: 音频数据（WAV或MP3格式）
+            bytes: 音频数据（未指定 response_format，服务端默认返回MP3）
             如果保存文件成功，返回None
             
         Raises:
-            Exception: API调用失败时抛出异常
+            Exception: API调用失败或返回空音频时抛出异常
             
         Example:
             >>> tts_api = TTSAPI()
@@ -67,6 +117,19 @@ class TTSAPI:
             if not text or not text.strip():
                 raise ValueError("文本内容不能为空")
 
+            voice = voice or _DEFAULT_VOICE
+            speed = max(0.5, min(2.0, speed))  # 限制速度范围
+
+            # 先查本地缓存
+            cache_path = self._cache_path(text, voice, speed)
+            if _is_cached(cache_path):
+                logger.info(f"TTS命中缓存: {cache_path}")
+                if save_path:
+                    shutil.copyfile(cache_path, save_path)
+                    logger.info(f"音频已保存到: {save_path}")
+                    return None
+                return cache_path.read_bytes()
+
             # 构建请求URL
             url = f"{self.base_url}/audio/speech"
 
@@ -74,36 +137,44 @@ class TTSAPI:
             payload = {
                 "model": self.model,
                 "input": text,
-                "voice": voice or "fnlp/MOSS-TTSD-v0.5:alex",  # 默认发音人
-                "speed": max(0.5, min(2.0, speed))  # 限制速度范围
+                "voice": voice,
+                "speed": speed
             }
 
             logger.info(f"调用TTS API: {self.model}, 文本长度: {len(text)}")
 
-            # 发送POST请求
-            response = requests.post(
+            # 发送POST请求（流式接收，保存文件时不必把整段音频读入内存）
+            with self.session.post(
                 url,
                 json=payload,
                 headers=self.headers,
-                timeout=60
-            )
+                timeout=60,
+                stream=True
+            ) as response:
+                # 检查响应状态
+                response.raise_for_status()
 
-            # 检查响应状态
-            response.raise_for_status()
+                # 如果指定了保存路径，则边接收边写入文件，再复制一份到缓存
+                if save_path:
+                    size = 0
+                    with open(save_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
+                            f.write(chunk)
+                            size += len(chunk)
+                    # 空响应不写缓存，否则这段文本以后永远命中一个空结果
+                    if size <= _MIN_AUDIO_BYTES:
+                        raise ValueError(f"TTS返回的音频为空（{size} 字节）")
+                    logger.info(f"TTS API响应成功，音频已保存到: {save_path}")
+                    self._write_cache(cache_path, lambda f: _copy_file(save_path, f))
+                    return None
 
-            # 获取音频数据
-            audio_data = response.content
+                # 否则返回音频数据
+                audio_data = response.content
 
+            if len(audio_data) <= _MIN_AUDIO_BYTES:
+                raise ValueError(f"TTS返回的音频为空（{len(audio_data)} 字节）")
             logger.info(f"TTS API响应成功，音频大小: {len(audio_data)} 字节")
-
-            # 如果指定了保存路径，则保存文件
-            if save_path:
-                with open(save_path, 'wb') as f:
-                    f.write(audio_data)
-                logger.info(f"音频已保存到: {save_path}")
-                return None
-
-            # 否则返回音频数据
+            self._write_cache(cache_path, lambda f: f.write(audio_data))
             return audio_data
 
         except requests.exceptions.Timeout:
@@ -119,6 +190,136 @@ class TTSAPI:
             logger.error(error_msg)
             raise Exception(error_msg)
 
+    def synthesize_cached(
+            self,
+            text: str,
+            voice: Optional[str] = None,
+            speed: float = 1.0
+    ) -> str:
+        """
+        合成语音并返回缓存中的音频文件路径
+
+        与 synthesize 共用同一份磁盘缓存：已缓存时直接返回缓存文件，
+        未缓存时合成结果只写入缓存这一处，调用方不必再另存一份
+
+        Args:
+            text: 要转换的文本内容（不能为空）
+            voice: 发音人ID（可选，使用默认发音人）
+            speed: 语速倍率，范围0.5-2.0，默认1.0
+
+        Returns:
+            str: 缓存音频文件路径（MP3）
+
+        Raises:
+            Exception: 合成失败或缓存写入失败时抛出异常
+        """
+        voice = voice or _DEFAULT_VOICE
+        speed = max(0.5, min(2.0, speed))
+        cache_path = self._cache_path(text, voice, speed)
+        if not _is_cached(cache_path):
+            self.synthesize(text, voice, speed)
+            if not _is_cached(cache_path):
+                raise Exception(f"TTS缓存写入失败: {cache_path}")
+        return str(cache_path)
+
+    def synthesize_batch(
+            self,
+            texts: List[str],
+            voice: Optional[str] = None,
+            speed: float = 1.0,
+            executor: Optional[Executor] = None
+    ) -> List[bytes]:
+        """
+        批量合成多段文本（如一轮对话拆出的多个句子）
+
+        语音合成接口每次只接受一段 input，这里用线程池并发发送，
+        各请求复用共享会话中的keep-alive连接；已缓存的文本不会再请求。
+
+        Args:
+            texts: 要合成的文本列表
+            voice: 发音人ID（可选）
+            speed: 语速倍率
+            executor: 执行合成任务的线程池（可选，如应用自己的全局线程池）；
+                      未传入时使用模块级共享线程池，不会每次调用都新建线程
+
+        Returns:
+            List[bytes]: 与 texts 顺序一一对应的音频数据
+
+        Raises:
+            Exception: 任意一段合成失败时抛出异常
+        """
+        if not texts:
+            return []
+
+        executor = executor or _batch_executor()
+        return list(executor.map(lambda text: self.synthesize(text, voice, speed), texts))
+
+    async def asynthesize(
+            self,
+            text: str,
+            voice: Optional[str] = None,
+            speed: float = 1.0,
+            save_path: Optional[str] = None
+    ) -> Optional[bytes]:
+        """
+        synthesize 的异步版本，参数和返回值相同
+
+        合成请求在线程中执行，事件循环可同时处理其他请求
+        """
+        return await asyncio.to_thread(self.synthesize, text, voice, speed, save_path)
+
+    def _cache_path(self, text: str, voice: str, speed: float) -> Path:
+        """缓存文件路径：按 模型+发音人+语速+文本 的哈希命名（未指定 response_format，服务端返回MP3）"""
+        cache_key = hashlib.sha256(f"{self.model}|{voice}|{speed}|{text}".encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{cache_key}.mp3"
+
+    def _write_cache(self, cache_path: Path, write: Callable[[BinaryIO], Any]) -> None:
+        """
+        原子写入缓存文件（先写临时文件再替换），避免并发读到半个文件
+
+        write 负责把音频内容写入传入的临时文件对象；
+        缓存写入失败不影响合成结果，只记录警告，并删除写了一半的临时文件
+        """
+        tmp_path = None
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, cache_path)
+            tmp_path = None
+            if self.cache_max_bytes > 0:
+                self._prune_cache()
+        except OSError as e:
+            logger.warning(f"TTS缓存写入失败: {str(e)}")
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except FileNotFoundError:
+                    pass
+
+    def _prune_cache(self) -> None:
+        """缓存总大小超过上限时，按写入时间从旧到新删除音频文件，直到低于上限"""
+        try:
+            entries = []
+            total = 0
+            for path in self.cache_dir.glob("*.mp3"):
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            if total <= self.cache_max_bytes:
+                return
+            entries.sort()
+            for _, size, path in entries:
+                path.unlink(missing_ok=True)
+                total -= size
+                if total <= self.cache_max_bytes:
+                    break
+            logger.info(f"TTS缓存超过上限，已清理至 {total / 1024 / 1024:.1f} MB")
+        except OSError as e:
+            logger.warning(f"TTS缓存清理失败: {str(e)}")
+
     def synthesize_to_base64(self, text: str, voice: Optional[str] = None) -> str:
         """
         将文本转换为语音，并返回Base64编码的音频数据
@@ -143,7 +344,7 @@ class TTSAPI:
 
             # 转换为Base64
             if audio_data:
-                base64_audio = base64.b64encode(audio_data).decode('utf-8')
+                base64_audio = base64.b64encode(audio_data).decode('ascii')
                 logger.info(f"音频已转换为Base64，长度: {len(base64_audio)}")
                 return base64_audio
             else:
@@ -154,8 +355,17 @@ class TTSAPI:
             raise
 
 
-# 创建全局实例，方便其他模块直接导入使用
-tts_api = TTSAPI()
+@lru_cache(maxsize=None)
+def get_tts_api() -> TTSAPI:
+    """获取全局TTS实例，首次调用时才创建"""
+    return TTSAPI()
+
+
+def __getattr__(name: str):
+    # PEP 562：`from api.tts_api import tts_api` 用法不变，但导入模块时不再立即创建实例
+    if name == "tts_api":
+        return get_tts_api()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # 示例代码（仅用于测试）
 if __name__ == "__main__":
@@ -163,6 +373,8 @@ if __name__ == "__main__":
     测试TTS API功能
     运行方式: python -m api.tts_api
     """
+    tts_api = get_tts_api()
+
     try:
         # 测试语音合成
         test_text = "你好，这是硅基流动语音合成测试。"
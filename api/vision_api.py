@@ -13,11 +13,49 @@
 - Qwen3-Omni 系列：全模态（视觉+音频+视频）
 """
 import requests
-import base64
-from typing import Optional, Union
+try:
+    # 可选依赖：pybase64 使用SIMD指令加速，大文件编码快数倍；未安装时回退到标准库
+    import pybase64 as base64
+except ImportError:
+    import base64
+import asyncio
+import os
+import orjson
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Generator, Optional, Union
 from pathlib import Path
 from loguru import logger
 from config.settings import settings
+from api.sse import iter_sse_data
+
+
+def _sniff_image_mime(head: bytes) -> str:
+    """根据文件头（魔数）判断图片MIME类型，无法识别时按JPEG处理"""
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"GIF8"):
+        return "image/gif"
+    return "image/jpeg"
+
+
+@lru_cache(maxsize=16)
+def _cached_data_url(image_path: str, mtime_ns: int, size: int) -> str:
+    """
+    读取本地图片并生成Data URL（带缓存）
+    
+    修改时间和文件大小是缓存键的一部分，文件被修改后自动失效；
+    同一张图片的多轮提问不再重复读盘和Base64编码
+    """
+    with open(image_path, "rb") as image_file:
+        raw = image_file.read()
+    image_data = base64.b64encode(raw).decode('ascii')
+    logger.info(f"图片已编码，大小: {size} 字节")
+    return f"data:{_sniff_image_mime(raw[:12])};base64,{image_data}"
 
 
 class VisionAPI:
@@ -38,6 +76,14 @@ class VisionAPI:
     - deepseek-ai/DeepSeek-VL2（DeepSeek视觉模型）
     """
     
+    # analyze_image_detailed 的分析维度及对应提问
+    DETAIL_PROMPTS = {
+        "description": "请整体描述这张图片",
+        "objects": "列出图片中的主要物体",
+        "scene": "这是什么类型的场景？",
+        "colors": "图片的主要颜色是什么？"
+    }
+    
     def __init__(self):
         """
         初始化Vision API
@@ -49,7 +95,16 @@ class VisionAPI:
         """
         self.base_url = settings.SILICONFLOW_BASE_URL
         self.model = settings.VLM_MODEL
-        self.headers = settings.get_headers()
+        self.headers = settings.headers_json
+        # 接口地址和固定的采样参数只构建一次
+        self.chat_url = f"{self.base_url}/chat/completions"
+        self._base_payload = {
+            "model": self.model,
+            "max_tokens": settings.MAX_TOKENS,
+            "temperature": 0.7
+        }
+        # 使用全局共享的HTTP会话（连接池），避免每次请求重新建立TCP+TLS连接
+        self.session = settings.http
         
         logger.info(f"Vision API 初始化: {self.model}")
     
@@ -77,7 +132,7 @@ class VisionAPI:
                 image_data = image_file.read()
             
             # 转换为Base64
-            base64_image = base64.b64encode(image_data).decode('utf-8')
+            base64_image = base64.b64encode(image_data).decode('ascii')
             
             logger.info(f"图片已编码，大小: {len(image_data)} 字节")
             return base64_image
@@ -86,6 +141,35 @@ class VisionAPI:
             logger.error(f"图片编码失败: {str(e)}")
             raise
     
+    def _prepare_image_url(self, image_source: Union[str, bytes]) -> str:
+        """
+        将图片来源统一转换为API可用的图片URL
+        
+        Args:
+            image_source: 本地文件路径、图片URL、Data URL或二进制数据
+            
+        Returns:
+            str: 网络图片URL或 data:image/<格式>;base64,... 格式的Data URL
+        """
+        if isinstance(image_source, bytes):
+            # 如果是二进制数据，直接编码
+            image_data = base64.b64encode(image_source).decode('ascii')
+            logger.info("使用二进制图片数据")
+            return f"data:{_sniff_image_mime(image_source[:12])};base64,{image_data}"
+        
+        if image_source.startswith(('http://', 'https://', 'data:')):
+            # 如果是URL（或已编码的Data URL），直接使用
+            logger.info(f"使用图片URL: {image_source[:50]}...")
+            return image_source
+        
+        # 如果是本地文件路径，先编码（同一文件未修改时直接复用缓存）
+        try:
+            stat = os.stat(image_source)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"图片文件不存在: {image_source}")
+        logger.info(f"使用本地图片: {image_source}")
+        return _cached_data_url(image_source, stat.st_mtime_ns, stat.st_size)
+    
     def describe_image(
         self, 
         image_source: Union[str, bytes],
@@ -99,6 +183,7 @@ class VisionAPI:
             image_source: 图片来源，可以是：
                          - 本地文件路径（str）如 "photo.jpg"
                          - 图片URL（str）如 "https://example.com/image.jpg"
+                         - Data URL（str）如 "data:image/jpeg;base64,..."
                          - 图片二进制数据（bytes）
             prompt: 对图片的提问（可选）
                    - 如果不传，默认描述图片内容
@@ -122,94 +207,168 @@ class VisionAPI:
         """
         try:
             # 1. 处理图片数据
-            if isinstance(image_source, bytes):
-                # 如果是二进制数据，直接编码
-                image_data = base64.b64encode(image_source).decode('utf-8')
-                image_url = f"data:image/jpeg;base64,{image_data}"
-                logger.info("使用二进制图片数据")
-                
-            elif image_source.startswith(('http://', 'https://')):
-                # 如果是URL，直接使用
-                image_url = image_source
-                logger.info(f"使用图片URL: {image_url[:50]}...")
-                
-            else:
-                # 如果是本地文件路径，先编码
-                image_data = self.encode_image_to_base64(image_source)
-                image_url = f"data:image/jpeg;base64,{image_data}"
-                logger.info(f"使用本地图片: {image_source}")
-            
-            # 2. 构建提示词
-            if not prompt:
-                # 默认提示词：描述图片内容
-                prompt = "请详细描述这张图片的内容，包括主要物体、场景、颜色、氛围等信息。"
+            image_url = self._prepare_image_url(image_source)
             
-            # 3. 构建消息
-            # 使用OpenAI Vision API兼容格式
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": image_url,
-                                "detail": detail
-                            }
-                        }
-                    ]
-                }
-            ]
+            # 2. 调用模型
+            return self._call_vlm(image_url, prompt, detail)
             
-            # 4. 构建请求
-            url = f"{self.base_url}/chat/completions"
+        except Exception as e:
+            return self._error_message(e)
+    
+    async def adescribe_image(
+        self,
+        image_source: Union[str, bytes],
+        prompt: Optional[str] = None,
+        detail: str = "auto"
+    ) -> str:
+        """
+        describe_image 的异步版本，参数和返回值相同
+        
+        图片编码和模型调用都在线程中执行，不阻塞事件循环
+        """
+        return await asyncio.to_thread(self.describe_image, image_source, prompt, detail)
+    
+    def describe_image_stream(
+        self,
+        image_source: Union[str, bytes],
+        prompt: Optional[str] = None,
+        detail: str = "auto"
+    ) -> Generator[str, None, None]:
+        """
+        流式描述图片，边生成边返回文本片段
+        
+        参数与 describe_image 相同；首个片段约一个往返即可到达，
+        适合在界面上逐字显示。出错时产出一条 "❌" 开头的错误提示。
+        
+        Yields:
+            str: 流式输出的文本片段
+        """
+        try:
+            image_url = self._prepare_image_url(image_source)
             payload = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": settings.MAX_TOKENS,
-                "temperature": 0.7
+                **self._base_payload,
+                "messages": self._build_messages(image_url, prompt, detail),
+                "stream": True
             }
             
-            logger.info(f"调用Vision API: {self.model}")
-            
-            # 5. 发送请求
-            response = requests.post(
-                url, 
-                json=payload, 
-                headers=self.headers, 
-                timeout=60
+            logger.info(f"调用流式Vision API: {self.model}")
+            response = self.session.post(
+                self.chat_url,
+                data=orjson.dumps(payload),
+                headers=self.headers,
+                timeout=60,
+                stream=True
             )
-            
-            # 6. 检查响应
             response.raise_for_status()
             
-            # 7. 解析结果
-            result = response.json()
-            description = result["choices"][0]["message"]["content"]
+            # SSE解析方式与 TextAPI.chat_stream 一致
+            for data in iter_sse_data(response.iter_content(chunk_size=8192)):
+                if data == b'[DONE]':
+                    break
+                try:
+                    chunk = orjson.loads(data)
+                    if chunk.get('choices'):
+                        content = chunk['choices'][0].get('delta', {}).get('content', '')
+                        if content:
+                            yield content
+                except orjson.JSONDecodeError:
+                    continue
+            
+            logger.info("流式Vision API响应完成")
+            
+        except Exception as e:
+            yield self._error_message(e)
+    
+    def _call_vlm(
+        self,
+        image_url: str,
+        prompt: Optional[str] = None,
+        detail: str = "auto"
+    ) -> str:
+        """
+        使用已准备好的图片URL调用一次VLM模型
+        
+        Args:
+            image_url: 网络图片URL或Data URL（由 _prepare_image_url 生成）
+            prompt: 对图片的提问（可选）
+            detail: 图片分析详细程度
             
-            logger.info(f"Vision API响应成功，描述长度: {len(description)}")
-            return description
+        Returns:
+            str: 模型回复
             
-        except FileNotFoundError as e:
+        Raises:
+            Exception: API调用失败时抛出异常（由调用方转换为错误提示）
+        """
+        # 1. 构建消息
+        messages = self._build_messages(image_url, prompt, detail)
+        
+        # 2. 构建请求
+        payload = {**self._base_payload, "messages": messages}
+        
+        logger.info(f"调用Vision API: {self.model}")
+        
+        # 3. 发送请求（请求体含数MB的Base64图片，用orjson序列化比标准库json快得多；
+        #    self.headers 已带 Content-Type: application/json）
+        response = self.session.post(
+            self.chat_url, 
+            data=orjson.dumps(payload), 
+            headers=self.headers, 
+            timeout=60
+        )
+        
+        # 4. 检查响应
+        response.raise_for_status()
+        
+        # 5. 解析结果
+        result = response.json()
+        description = result["choices"][0]["message"]["content"]
+        
+        logger.info(f"Vision API响应成功，描述长度: {len(description)}")
+        return description
+    
+    @staticmethod
+    def _build_messages(
+        image_url: str,
+        prompt: Optional[str] = None,
+        detail: str = "auto"
+    ) -> list:
+        """构建图文混合的消息列表（OpenAI Vision API兼容格式）"""
+        if not prompt:
+            # 默认提示词：描述图片内容
+            prompt = "请详细描述这张图片的内容，包括主要物体、场景、颜色、氛围等信息。"
+        
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": prompt
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": image_url,
+                            "detail": detail
+                        }
+                    }
+                ]
+            }
+        ]
+    
+    @staticmethod
+    def _error_message(e: Exception) -> str:
+        """将异常转换为返回给用户的错误提示"""
+        if isinstance(e, FileNotFoundError):
             error_msg = f"文件未找到: {str(e)}"
-            logger.error(error_msg)
-            return f"❌ {error_msg}"
-        except requests.exceptions.Timeout:
+        elif isinstance(e, requests.exceptions.Timeout):
             error_msg = "Vision API请求超时"
-            logger.error(error_msg)
-            return f"❌ {error_msg}"
-        except requests.exceptions.RequestException as e:
+        elif isinstance(e, requests.exceptions.RequestException):
             error_msg = f"Vision API调用失败: {str(e)}"
-            logger.error(error_msg)
-            return f"❌ {error_msg}"
-        except Exception as e:
+        else:
             error_msg = f"图片分析失败: {str(e)}"
-            logger.error(error_msg)
-            return f"❌ {error_msg}"
+        logger.error(error_msg)
+        return f"❌ {error_msg}"
     
     def analyze_image_detailed(self, image_source: Union[str, bytes]) -> dict:
         """
@@ -228,18 +387,49 @@ class VisionAPI:
                 }
         """
         try:
-            # 分别提问不同维度
-            description = self.describe_image(image_source, "请整体描述这张图片")
-            objects = self.describe_image(image_source, "列出图片中的主要物体")
-            scene = self.describe_image(image_source, "这是什么类型的场景？")
-            colors = self.describe_image(image_source, "图片的主要颜色是什么？")
+            # 图片只编码一次，四个维度共用
+            image_url = self._prepare_image_url(image_source)
+            
+            # 分别提问不同维度（相互独立，并发请求，共享连接池）
+            prompts = self.DETAIL_PROMPTS
+            def ask(prompt: str) -> str:
+                try:
+                    return self._call_vlm(image_url, prompt)
+                except Exception as e:
+                    return self._error_message(e)
             
+            with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
+                futures = {
+                    executor.submit(ask, prompt): key
+                    for key, prompt in prompts.items()
+                }
+                results = {futures[future]: future.result() for future in as_completed(futures)}
+            
+            return {key: results[key] for key in prompts}
+            
+        except Exception as e:
+            logger.error(f"详细分析失败: {str(e)}")
             return {
-                "description": description,
-                "objects": objects,
-                "scene": scene,
-                "colors": colors
+                "error": str(e)
             }
+    
+    async def aanalyze_image_detailed(self, image_source: Union[str, bytes]) -> dict:
+        """
+        analyze_image_detailed 的异步版本，返回结构相同
+        
+        图片只编码一次，各维度的提问用 asyncio.gather 并发等待
+        """
+        try:
+            image_url = await asyncio.to_thread(self._prepare_image_url, image_source)
+            
+            async def ask(prompt: str) -> str:
+                try:
+                    return await asyncio.to_thread(self._call_vlm, image_url, prompt)
+                except Exception as e:
+                    return self._error_message(e)
+            
+            answers = await asyncio.gather(*(ask(p) for p in self.DETAIL_PROMPTS.values()))
+            return dict(zip(self.DETAIL_PROMPTS, answers))
             
         except Exception as e:
             logger.error(f"详细分析失败: {str(e)}")
@@ -248,8 +438,17 @@ class VisionAPI:
             }
 
 
-# 创建全局实例，方便其他模块直接导入使用
-vision_api = VisionAPI()
+@lru_cache(maxsize=None)
+def get_vision_api() -> VisionAPI:
+    """获取全局Vision实例，首次调用时才创建"""
+    return VisionAPI()
+
+
+def __getattr__(name: str):
+    # PEP 562：`from api.vision_api import vision_api` 用法不变，但导入模块时不再立即创建实例
+    if name == "vision_api":
+        return get_vision_api()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # 示例代码（仅用于测试）
@@ -258,6 +457,8 @@ if __name__ == "__main__":
     测试Vision API功能
     运行方式: python -m api.vision_api
     """
+    vision_api = get_vision_api()
+    
     try:
         # 测试图片描述（需要准备一张测试图片）
         test_image = "test_image.jpg"
@@ -2,13 +2,39 @@
 硅基流动API配置文件
 """
 import os
-from typing import Dict
+import ssl
+from functools import cached_property
+from types import MappingProxyType
+from typing import Dict, Mapping
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_CA_BUNDLE_PATH
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
 # 加载环境变量
 load_dotenv()
 
 
+class SSLContextAdapter(HTTPAdapter):
+    """使用预先构建好的SSLContext的HTTPAdapter，新建连接时不再重复加载CA证书"""
+    
+    def __init__(self, ssl_context: ssl.SSLContext, **kwargs):
+        self.ssl_context = ssl_context
+        super().__init__(**kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = self.ssl_context
+        return super().init_poolmanager(*args, **kwargs)
+    
+    def cert_verify(self, conn, url, verify, cert):
+        super().cert_verify(conn, url, verify, cert)
+        # verify=True 时证书已在上下文中，避免旧版requests每次连接都把CA文件再加载一遍
+        if verify is True:
+            conn.ca_certs = None
+            conn.ca_cert_dir = None
+
+
 class Settings:
     """配置类"""
     
@@ -21,12 +47,18 @@ class Settings:
     MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "4096"))
     TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0.7"))
     TOP_P: float = float(os.getenv("TOP_P", "0.7"))
+    # 对话结果缓存条数（相同的对话上下文直接返回缓存回复，设为0关闭）
+    CHAT_CACHE_SIZE: int = int(os.getenv("CHAT_CACHE_SIZE", "1024"))
     
     # 语音识别模型配置
     SPEECH_MODEL: str = os.getenv("SPEECH_MODEL", "FunAudioLLM/SenseVoiceSmall")
+    # 识别结果缓存条数（相同音频内容直接返回缓存结果，设为0关闭）
+    ASR_CACHE_SIZE: int = int(os.getenv("ASR_CACHE_SIZE", "256"))
     
     # 语音合成模型配置
     TTS_MODEL: str = os.getenv("TTS_MODEL", "fishaudio/fish-speech-1.5")
+    # 语音合成磁盘缓存上限（MB），超出后按写入时间删除最旧的音频，设为0不限制
+    TTS_CACHE_MAX_MB: int = int(os.getenv("TTS_CACHE_MAX_MB", "200"))
     
     # 图像生成模型配置
     IMAGE_MODEL: str = os.getenv("IMAGE_MODEL", "stabilityai/stable-diffusion-3-5-large")
@@ -34,20 +66,79 @@ class Settings:
     # 图像识别模型配置 (Vision Language Model)
     # 根据官方文档推荐：https://docs.siliconflow.cn/cn/userguide/capabilities/multimodal-vision
     VLM_MODEL: str = os.getenv("VLM_MODEL", "Qwen/Qwen2-VL-7B-Instruct")
+    # 上传给VLM前图片最长边的上限（像素），大多数VLM服务端也会缩到这个尺寸左右，设为0不缩放
+    VLM_MAX_DIM: int = int(os.getenv("VLM_MAX_DIM", "1024"))
     
     # 音频文件保存路径
     AUDIO_OUTPUT_DIR: str = os.getenv("AUDIO_OUTPUT_DIR", "outputs/audio")
     IMAGE_OUTPUT_DIR: str = os.getenv("IMAGE_OUTPUT_DIR", "outputs/images")
     
+    # HTTP连接池配置（所有API共用一个会话）
+    # 每个主机保持的最大空闲连接数，应不小于同时在途的请求数（如并发的图像分析+语音合成）
+    HTTP_POOL_MAXSIZE: int = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))
+    HTTP_MAX_RETRIES: int = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+    # CA证书文件（可选，默认使用requests自带的certifi证书包）
+    SSL_CA_FILE: str = os.getenv("SSL_CA_FILE", "")
+    
+    # Gradio公网分享链接（经Gradio中转服务器，每个请求都多一跳，默认关闭）
+    GRADIO_SHARE: bool = os.getenv("GRADIO_SHARE", "false").lower() in ("1", "true")
+    
     # 日志配置
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     
+    def __init__(self):
+        # 共享HTTP会话：ASR/文本/TTS/视觉客户端都访问同一个主机，
+        # 共用一个连接池可以让 语音→对话→语音 这类流水线复用同一条keep-alive连接
+        self.http = self.create_http_session()
+    
+    @classmethod
+    def create_ssl_context(cls) -> ssl.SSLContext:
+        """创建共享的SSLContext，CA证书只在这里加载一次"""
+        ctx = ssl.create_default_context(cafile=cls.SSL_CA_FILE or DEFAULT_CA_BUNDLE_PATH)
+        ctx.minimum_version = ssl.TLSVersion.TLSv1_2
+        return ctx
+    
+    @classmethod
+    def create_http_session(cls) -> requests.Session:
+        """创建带连接池和重试策略的HTTP会话"""
+        session = requests.Session()
+        session.mount("https://", SSLContextAdapter(
+            cls.create_ssl_context(),
+            pool_connections=10,
+            pool_maxsize=cls.HTTP_POOL_MAXSIZE,
+            max_retries=Retry(
+                total=cls.HTTP_MAX_RETRIES,
+                backoff_factor=0.3,
+                status_forcelist=[502, 503, 504]
+            )
+        ))
+        return session
+    
+    @cached_property
+    def headers_auth_only(self) -> Mapping[str, str]:
+        """只含鉴权的请求头（multipart上传用，Content-Type由requests自动生成带boundary的值），只读"""
+        return MappingProxyType({"Authorization": f"Bearer {self.SILICONFLOW_API_KEY}"})
+    
+    @cached_property
+    def headers_json(self) -> Mapping[str, str]:
+        """JSON请求的请求头，只构建一次，各客户端共用（只读，修改会抛出 TypeError）"""
+        return MappingProxyType({**self.headers_auth_only, "Content-Type": "application/json"})
+    
     def get_headers(self) -> Dict[str, str]:
-        """获取API请求头"""
-        return {
-            "Authorization": f"Bearer {self.SILICONFLOW_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        """获取API请求头（返回新的字典，调用方可以随意修改）"""
+        return dict(self.headers_json)
+    
+    def warm_up_http(self) -> None:
+        """
+        预先建立一条到API主机的keep-alive连接
+        
+        连接池让后续请求免去TCP+TLS握手，但第一次请求仍要付出这部分开销；
+        启动时在后台发一个轻量请求，用户的第一条消息就能直接复用连接。失败时忽略。
+        """
+        try:
+            self.http.get(f"{self.SILICONFLOW_BASE_URL}/models", headers=self.headers_auth_only, timeout=10).close()
+        except requests.RequestException:
+            pass
     
     def validate(self) -> bool:
         """验证配置是否完整"""
@@ -3,19 +3,39 @@
 集成文本对话、语音合成、图像识别功能
 """
 import gradio as gr
-import os
-import time
+import atexit
+import hashlib
+import io
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from loguru import logger
+from PIL import Image
 import sys
 
 # 导入API模块
-from api.text_api import text_api
+from api.text_api import text_api, accumulate_stream
 from api.tts_api import tts_api
 from api.vision_api import vision_api
 from api.asr_api import asr_api
+from api.cache import LRUCache
 from config.settings import settings
 
+try:
+    # 可选依赖：xxhash 比 sha256/blake2b 快一个数量级，哈希大尺寸图片时更明显
+    import xxhash
+    _new_image_hasher = xxhash.xxh3_128
+except ImportError:
+    _new_image_hasher = lambda: hashlib.blake2b(digest_size=16)
+
+try:
+    # OpenCV（libjpeg-turbo）编码JPEG比Pillow快数倍；未安装时回退到Pillow
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+
 # ==================== 配置日志 ====================
 logger.remove()
 logger.add(
@@ -25,51 +45,103 @@ logger.add(
 )
 
 
+# ==================== 错误提示模板 ====================
+# 常见错误的提示文本在导入时定义一次，出错时用 str.format 填入模型名和原始错误；
+# 集中放在这里也便于修改或翻译提示内容
+
+VLM_403_TMPL = """❌ 图像识别权限错误 (403 Forbidden)
+
+当前模型：{model}
+
+🔧 快速修复方法：
+
+1. 打开项目目录中的 .env 文件
+2. 修改 VLM_MODEL 配置，尝试以下模型：
+
+   VLM_MODEL=Qwen/Qwen2-VL-7B-Instruct
+
+3. 保存后重启应用
+
+💡 更多解决方案：
+   - 运行诊断脚本：python test_vision_api.py
+   - 查看详细文档：VISION_FIX.md
+   - 检查 API 权限：https://cloud.siliconflow.cn/account/ak
+
+原始错误：{error}"""
+
+VLM_403_SHORT_TMPL = """❌ 图像识别权限错误 (403 Forbidden)
+
+当前模型：{model}
+
+🔧 快速修复方法：
+
+1. 打开 .env 文件
+2. 修改 VLM_MODEL 为：Qwen/Qwen2-VL-7B-Instruct
+3. 保存并重启应用
+
+💡 或运行诊断脚本：python test_vision_api.py
+
+原始错误：{error}"""
+
+ASR_403_TMPL = """❌ 语音识别权限错误 (403 Forbidden)
+
+当前模型：{model}
+
+🔧 可能的原因：
+1. API Key 没有访问语音识别模型的权限
+2. 账户余额不足
+
+💡 解决方法：
+1. 检查 API 权限：https://cloud.siliconflow.cn/account/ak
+2. 查看账户余额：https://cloud.siliconflow.cn/account/billing
+3. 尝试运行测试脚本：python test/test_asr_local.py
+
+原始错误：{error}"""
+
+ASR_400_TMPL = """❌ 音频格式错误 (400 Bad Request)
+
+可能的原因：
+1. 音频文件格式不支持
+2. 音频文件损坏
+3. 文件大小超出限制
+
+💡 解决方法：
+1. 支持的格式：MP3, WAV, M4A, FLAC, OGG, WebM
+2. 建议文件大小：< 25MB
+3. 建议音频时长：< 30分钟
+4. 如果是录音，请检查麦克风是否正常
+
+原始错误：{error}"""
+
+
 # ==================== 工具函数 ====================
 
+# 全局线程池：逐句语音合成、批量语音识别等后台任务共用，不必每次请求都创建线程
+EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="demo")
+atexit.register(EXECUTOR.shutdown, wait=False, cancel_futures=True)
+
+
 def ensure_output_dirs():
     """
     确保输出目录存在
-    创建音频和图片的保存目录
+    创建音频和图片的保存目录（启动时调用一次）
     """
     Path(settings.AUDIO_OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
     Path(settings.IMAGE_OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
 
 
-def convert_history_to_tuples(messages):
-    """
-    将OpenAI格式的消息列表转换为元组格式
-    
-    Args:
-        messages: [{"role": "user", "content": "..."}, {"role": "assistant", "content": "..."}, ...]
-        
-    Returns:
-        [("user_msg", "assistant_msg"), ...]
-    
-    说明:
-        这个转换是为了兼容text_api的历史记录格式
-    """
-    history = []
-    i = 0
-    while i < len(messages):
-        # 每次处理一对user-assistant消息
-        if i + 1 < len(messages) and messages[i]["role"] == "user" and messages[i+1]["role"] == "assistant":
-            history.append((messages[i]["content"], messages[i+1]["content"]))
-            i += 2
-        else:
-            i += 1
-    return history
-
-
 # ==================== 文本对话功能 ====================
 
-def chat_stream_response(message, history):
+def chat_stream_response(message, history, history_tuples):
     """
     处理流式聊天响应（纯文本对话，参考 demo_text.py 的清晰逻辑）
     
     Args:
         message: 用户输入的消息
         history: 历史对话记录（OpenAI格式）
+        history_tuples: 已完成轮次的 [(user_msg, assistant_msg), ...]，
+                        与 history 同步维护，每轮结束后追加一项，
+                        不必每轮都从 history 重新转换
         
     Yields:
         更新的历史记录
@@ -80,8 +152,7 @@ def chat_stream_response(message, history):
         3. 流式获取AI回复 → 逐字显示，体验流畅
     """
     try:
-        # 验证配置
-        settings.validate()
+        # 配置已在 main() 启动时验证过，这里不再逐条消息重复验证
         
         # 立即添加用户消息到历史
         history.append({"role": "user", "content": message})
@@ -91,25 +162,18 @@ def chat_stream_response(message, history):
         history.append({"role": "assistant", "content": ""})
         yield history
         
-        # 转换历史格式用于API调用
-        chat_history = convert_history_to_tuples(history[:-2])  # 不包括当前消息
-        
-        # 调用流式API
+        # 调用流式API（history_tuples 只含之前的轮次）
         logger.info(f"用户输入(流式): {message}")
+        # 片段分批拼接后再刷新界面（刷新规则见 accumulate_stream，与文本Demo一致）
         full_response = ""
-        for chunk in text_api.chat_stream(message=message, history=chat_history):
-            full_response += chunk
+        for full_response in accumulate_stream(text_api.chat_stream(message=message, history=history_tuples)):
             history[-1]["content"] = full_response
             yield history
         
+        # 本轮完成，追加到元组格式的历史中
+        history_tuples.append((message, full_response))
         logger.info(f"流式响应完成，总长度: {len(full_response)}")
         
-    except ValueError as e:
-        error_msg = f"⚠️ 配置错误: {str(e)}\n\n请在项目根目录创建 .env 文件并配置 SILICONFLOW_API_KEY"
-        logger.error(error_msg)
-        if history and history[-1]["role"] == "assistant":
-            history[-1]["content"] = error_msg
-        yield history
     except Exception as e:
         error_msg = f"❌ 系统错误: {str(e)}"
         logger.error(error_msg)
@@ -118,6 +182,32 @@ def chat_stream_response(message, history):
         yield history
 
 
+# 句子结束符：流式输出中遇到这些字符就把已完整的句子提前送去语音合成
+_SENTENCE_ENDINGS = "。！？!?；;\n"
+
+
+def split_sentences(text):
+    """
+    把文本切分为已完整的句子和末尾尚未结束的部分
+    
+    英文句号只有后面跟着空白时才算句末，避免把 3.14、v1.5 这类数字拆开；
+    末尾的句号要等下一个片段到达后才能确定。
+    
+    Args:
+        text: 待切分的文本
+        
+    Returns:
+        (sentences, rest): 完整句子列表（含结束符）和剩余文本
+    """
+    sentences = []
+    start = 0
+    for i, ch in enumerate(text):
+        if ch in _SENTENCE_ENDINGS or (ch == "." and i + 1 < len(text) and text[i + 1].isspace()):
+            sentences.append(text[start:i + 1])
+            start = i + 1
+    return sentences, text[start:]
+
+
 def synthesize_speech(text):
     """
     语音合成功能（独立函数，作为可选的后处理步骤）
@@ -131,16 +221,12 @@ def synthesize_speech(text):
     try:
         if not text or not text.strip():
             return None
-            
-        logger.info("开始语音合成...")
         
-        # 生成唯一的音频文件名
-        timestamp = int(time.time())
-        audio_filename = f"tts_{timestamp}.wav"
-        audio_path = os.path.join(settings.AUDIO_OUTPUT_DIR, audio_filename)
+        logger.info("开始语音合成...")
         
-        # 调用TTS API
-        tts_api.synthesize(text=text, save_path=audio_path)
+        # 直接使用 TTSAPI 磁盘缓存中的文件：同样的文本（问候语、重复点击）不再重复合成，
+        # 也不在输出目录另存一份
+        audio_path = tts_api.synthesize_cached(text=text)
         
         logger.info(f"✅ 语音合成成功: {audio_path}")
         return audio_path
@@ -152,6 +238,90 @@ def synthesize_speech(text):
 
 # ==================== 图像识别功能 ====================
 
+# 图片分析结果缓存：同一张图片+同一个问题直接返回上次的结果（多轮追问同一张照片时常见）
+_description_cache = LRUCache(maxsize=64)
+
+
+def mm_hash(image_path):
+    """
+    计算图片文件内容的哈希，用作分析结果缓存键
+    
+    安装了 xxhash 时使用更快的 xxh3_128，否则用标准库的 blake2b
+    
+    Args:
+        image_path: 图片文件路径
+        
+    Returns:
+        str: 十六进制哈希值
+    """
+    hasher = _new_image_hasher()
+    with open(image_path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def encode_jpeg(pil_image, max_dim=None):
+    """
+    在内存中把图片编码为JPEG，最长边超过 max_dim 时先等比缩小
+    
+    Args:
+        pil_image: PIL图片
+        max_dim: 最长边上限，默认取 settings.VLM_MAX_DIM（0表示不缩放）
+        
+    Returns:
+        bytes: JPEG数据
+    """
+    max_dim = settings.VLM_MAX_DIM if max_dim is None else max_dim
+    if pil_image.mode != "RGB":
+        # JPEG不支持透明通道（如PNG上传的RGBA图片）
+        pil_image = pil_image.convert("RGB")
+    if cv2 is not None:
+        encoded = _encode_bgr(cv2.cvtColor(np.asarray(pil_image), cv2.COLOR_RGB2BGR), max_dim)
+        if encoded is not None:
+            return encoded
+    if max_dim > 0 and max(pil_image.size) > max_dim:
+        pil_image = pil_image.copy()
+        pil_image.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    pil_image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def encode_jpeg_file(image_path, max_dim=None):
+    """
+    读取图片文件并编码为（缩小后的）JPEG
+    
+    有OpenCV时直接用 cv2.imread 解码，不经过Pillow；否则回退到 encode_jpeg
+    
+    Args:
+        image_path: 图片文件路径
+        max_dim: 最长边上限，默认取 settings.VLM_MAX_DIM（0表示不缩放）
+        
+    Returns:
+        bytes: JPEG数据
+    """
+    max_dim = settings.VLM_MAX_DIM if max_dim is None else max_dim
+    if cv2 is not None:
+        bgr = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if bgr is not None:
+            encoded = _encode_bgr(bgr, max_dim)
+            if encoded is not None:
+                return encoded
+    with Image.open(image_path) as pil_image:
+        return encode_jpeg(pil_image, max_dim)
+
+
+def _encode_bgr(bgr, max_dim):
+    """用OpenCV缩放（INTER_AREA，缩小时质量好且快）并编码BGR数组，失败返回None"""
+    h, w = bgr.shape[:2]
+    scale = max_dim / max(h, w) if max_dim > 0 else 1.0
+    if scale < 1:
+        bgr = cv2.resize(bgr, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    return encoded.tobytes() if ok else None
+
+
 def analyze_image(image, question):
     """
     分析图片内容（支持两种图片输入方式）
@@ -164,8 +334,7 @@ def analyze_image(image, question):
     Args:
         image: 图片文件（来自摄像头或上传）
                 - None: 没有图片
-                - str: 图片文件路径（会自动Base64编码）
-                - numpy.ndarray: 图片数组（摄像头拍摄，会自动保存并编码）
+                - str: 图片文件路径（摄像头拍照和上传都是文件路径，会自动Base64编码）
         question: 用户对图片的提问
                  - 如果为空，默认描述图片内容
                  - 如果有内容，回答用户问题
@@ -174,8 +343,8 @@ def analyze_image(image, question):
         str: 图片分析结果
         
     技术实现:
-        1. Gradio摄像头 → numpy数组 → 保存为临时文件
-        2. Gradio上传 → 文件路径 → 直接使用
+        1. Gradio摄像头/上传 → 文件路径 → 直接使用（过大时先缩小）
+        2. 无需把图片解码成数组再重新编码
         3. vision_api 自动判断是URL还是本地路径
         4. 本地路径会自动转换为 data:image/jpeg;base64,... 格式
         5. 无需手动上传到网络，直接通过Base64传输
@@ -185,31 +354,7 @@ def analyze_image(image, question):
         if image is None:
             return "⚠️ 请先上传图片或使用摄像头拍照"
         
-        # ===== 步骤2: 处理不同类型的图片输入 =====
-        import numpy as np
-        from PIL import Image
-        
-        if isinstance(image, np.ndarray):
-            # 摄像头拍照：numpy数组 → 临时文件 → Base64编码
-            logger.info("处理摄像头图片（将自动Base64编码）")
-            
-            # 转换为PIL Image
-            pil_image = Image.fromarray(image)
-            
-            # 保存为临时文件
-            timestamp = int(time.time())
-            temp_image_path = os.path.join(settings.IMAGE_OUTPUT_DIR, f"camera_{timestamp}.jpg")
-            pil_image.save(temp_image_path)
-            
-            image_source = temp_image_path
-            logger.info(f"摄像头图片已保存: {temp_image_path}")
-            
-        else:
-            # 上传文件：直接使用路径（vision_api会自动Base64编码）
-            image_source = image
-            logger.info(f"处理上传图片: {image_source}（将自动Base64编码）")
-        
-        # ===== 步骤3: 构建提示词 =====
+        # ===== 步骤2: 构建提示词 =====
         if question and question.strip():
             # 用户有具体问题
             prompt = question
@@ -219,7 +364,27 @@ def analyze_image(image, question):
             prompt = None  # vision_api会使用默认提示词
             logger.info("使用默认描述模式")
         
-        # ===== 步骤4: 调用Vision API =====
+        # ===== 步骤3: 查缓存（命中时无需再读取和编码图片） =====
+        cache_key = (mm_hash(image), prompt, "auto")
+        cached = _description_cache.get(cache_key)
+        if cached is not None:
+            logger.info("图片分析命中缓存")
+            return cached
+        
+        # ===== 步骤4: 处理图片 =====
+        # 摄像头和上传都是文件路径（Gradio已编码好的图片），
+        # 尺寸不大时直接使用路径（vision_api会自动Base64编码）
+        image_source = image
+        with Image.open(image) as pil_image:
+            # Image.open 只读取文件头，拿到尺寸不需要解码整张图
+            size = pil_image.size
+        if settings.VLM_MAX_DIM > 0 and max(size) > settings.VLM_MAX_DIM:
+            # 大图先缩小再上传，传输的数据量能少好几倍
+            image_source = encode_jpeg_file(image)
+            logger.info(f"图片已从 {size} 缩小，大小: {len(image_source)} 字节")
+        logger.info(f"处理图片: {image}（将自动Base64编码）")
+        
+        # ===== 步骤5: 调用Vision API =====
         logger.info("开始分析图片...")
         description = vision_api.describe_image(
             image_source=image_source,
@@ -231,26 +396,11 @@ def analyze_image(image, question):
         
         # 检查是否返回了403错误消息
         if "403" in description or "Forbidden" in description:
-            return f"""❌ 图像识别权限错误 (403 Forbidden)
-
-当前模型：{settings.VLM_MODEL}
-
-🔧 快速修复方法：
-
-1. 打开项目目录中的 .env 文件
-2. 修改 VLM_MODEL 配置，尝试以下模型：
-
-   VLM_MODEL=Qwen/Qwen2-VL-7B-Instruct
-
-3. 保存后重启应用
-
-💡 更多解决方案：
-   - 运行诊断脚本：python test_vision_api.py
-   - 查看详细文档：VISION_FIX.md
-   - 检查 API 权限：https://cloud.siliconflow.cn/account/ak
-
-原始错误：{description}"""
+            return VLM_403_TMPL.format(model=settings.VLM_MODEL, error=description)
         
+        # 只缓存成功的结果，出错时下次重试
+        if not description.startswith("❌"):
+            _description_cache.put(cache_key, description)
         return description
         
     except Exception as e:
@@ -259,25 +409,23 @@ def analyze_image(image, question):
         
         # 特殊处理403错误
         if "403" in str(e) or "Forbidden" in str(e):
-            return f"""❌ 图像识别权限错误 (403 Forbidden)
-
-当前模型：{settings.VLM_MODEL}
-
-🔧 快速修复方法：
-
-1. 打开 .env 文件
-2. 修改 VLM_MODEL 为：Qwen/Qwen2-VL-7B-Instruct
-3. 保存并重启应用
-
-💡 或运行诊断脚本：python test_vision_api.py
-
-原始错误：{str(e)}"""
+            return VLM_403_SHORT_TMPL.format(model=settings.VLM_MODEL, error=e)
         
         return error_msg
 
 
 # ==================== 语音识别功能 ====================
 
+# 界面语言选项 → ASR API 语言参数
+LANGUAGE_MAP = {
+    "自动检测": "auto",
+    "中文": "zh",
+    "英文": "en",
+    "日语": "ja",
+    "粤语": "yue"
+}
+
+
 def transcribe_audio(audio_file, language_choice):
     """
     语音识别（语音转文字）
@@ -308,14 +456,7 @@ def transcribe_audio(audio_file, language_choice):
         logger.info("开始语音识别...")
         
         # 将语言选择映射到API参数
-        language_map = {
-            "自动检测": "auto",
-            "中文": "zh",
-            "英文": "en",
-            "日语": "ja",
-            "粤语": "yue"
-        }
-        language = language_map.get(language_choice, "auto")
+        language = LANGUAGE_MAP.get(language_choice, "auto")
         
         text = asr_api.transcribe(
             audio_source=audio_file,
@@ -344,38 +485,56 @@ def transcribe_audio(audio_file, language_choice):
         
         # 特殊处理常见错误
         if "403" in str(e) or "Forbidden" in str(e):
-            return f"""❌ 语音识别权限错误 (403 Forbidden)
-
-当前模型：{settings.SPEECH_MODEL}
-
-🔧 可能的原因：
-1. API Key 没有访问语音识别模型的权限
-2. 账户余额不足
-
-💡 解决方法：
-1. 检查 API 权限：https://cloud.siliconflow.cn/account/ak
-2. 查看账户余额：https://cloud.siliconflow.cn/account/billing
-3. 尝试运行测试脚本：python test/test_asr_local.py
-
-原始错误：{str(e)}"""
+            return ASR_403_TMPL.format(model=settings.SPEECH_MODEL, error=e)
         
         elif "400" in str(e) or "Bad Request" in str(e):
-            return f"""❌ 音频格式错误 (400 Bad Request)
+            return ASR_400_TMPL.format(error=e)
+        
+        return error_msg
 
-可能的原因：
-1. 音频文件格式不支持
-2. 音频文件损坏
-3. 文件大小超出限制
 
-💡 解决方法：
-1. 支持的格式：MP3, WAV, M4A, FLAC, OGG, WebM
-2. 建议文件大小：< 25MB
-3. 建议音频时长：< 30分钟
-4. 如果是录音，请检查麦克风是否正常
+def transcribe_batch(audio_files, language_choice):
+    """
+    批量语音识别：多个音频文件并发识别
+    
+    每个文件一个ASR请求，在全局线程池中并发执行，共用同一个连接池；
+    总耗时接近最慢的那个文件，而不是所有文件之和
+    
+    Args:
+        audio_files: 音频文件路径列表（来自多文件上传）
+        language_choice: 语言选择（同 transcribe_audio）
+    
+    Returns:
+        str: 按上传顺序拼接的识别结果
+    """
+    if not audio_files:
+        return "⚠️ 请先上传音频文件"
+    
+    language = LANGUAGE_MAP.get(language_choice, "auto")
+    logger.info(f"批量识别 {len(audio_files)} 个音频文件，语言设置: {language_choice}")
+    
+    def transcribe_one(audio_file):
+        # 单个文件失败不影响其他文件
+        try:
+            return asr_api.transcribe(audio_source=audio_file, language=language, response_format="text")
+        except Exception as e:
+            logger.error(f"语音识别失败 {audio_file}: {str(e)}")
+            return f"❌ 识别失败: {str(e)}"
+    
+    texts = list(EXECUTOR.map(transcribe_one, audio_files))
+    
+    sections = [
+        f"📄 {Path(audio_file).name}\n\n{text}"
+        for audio_file, text in zip(audio_files, texts)
+    ]
+    return f"""✅ 批量识别完成（{len(audio_files)} 个文件）
 
-原始错误：{str(e)}"""
-        
-        return error_msg
+""" + "\n\n---\n".join(sections) + f"""
+
+---
+📊 统计信息：
+- 语言设置：{language_choice}
+- 模型：{settings.SPEECH_MODEL}"""
 
 
 # ==================== Gradio界面 ====================
@@ -462,10 +621,11 @@ def create_demo():
                         avatar_images=(None, "🤖")
                     )
                     
-                    # 音频播放器
+                    # 音频播放器（流式：逐句合成的音频依次追加播放）
                     audio_output = gr.Audio(
                         label="语音播报",
                         type="filepath",
+                        streaming=True,
                         autoplay=True,  # 自动播放
                         visible=True
                     )
@@ -488,11 +648,14 @@ def create_demo():
                         )
                         send_btn = gr.Button("📤 发送", variant="primary", scale=1)
                         clear_btn = gr.Button("🗑️ 清空", scale=1)
+                    
+                    # 元组格式的对话历史（供 text_api 使用），与 chatbot 同步维护
+                    chat_history_tuples = gr.State([])
             
             # ===== 事件绑定 =====
             
             # 包装函数：处理流式响应（参考 demo_text.py 的清晰结构）
-            def handle_stream_wrapper(message, history, enable_tts):
+            def handle_stream_wrapper(message, history, history_tuples, enable_tts):
                 """
                 处理流式提交的包装函数
                 
@@ -500,7 +663,11 @@ def create_demo():
                     1. 检查输入是否为空
                     2. 清空输入框
                     3. 流式更新对话
-                    4. （可选）生成语音
+                    4. （可选）逐句生成语音
+                
+                开启语音播报时，每当回复中出现完整的一句话就立即提交合成，
+                与后续文本的生成同时进行；合成好的音频按句子顺序输出到
+                流式播放器，不必等整段回复生成完才开始播放。
                 """
                 if not message or not message.strip():
                     return history, "", None
@@ -508,39 +675,66 @@ def create_demo():
                 # 先清空输入框
                 yield history, "", None
                 
-                # 流式获取文本响应
-                final_history = None
-                for updated_history in chat_stream_response(message, history):
-                    final_history = updated_history
-                    yield updated_history, "", None
+                pending = deque()  # 按句子顺序排列的合成任务
+                spoken_len = 0     # 已提交合成的回复长度
+                last_state = None  # 上次输出时的（消息条数, 最后一条长度），内容没变就不重复推送
                 
-                # 如果启用TTS，在文本响应完成后生成语音
-                audio_path = None
-                if enable_tts and final_history and final_history[-1]["role"] == "assistant":
-                    response_text = final_history[-1]["content"]
-                    audio_path = synthesize_speech(response_text)
+                def submit_sentences(sentences):
+                    for sentence in sentences:
+                        if sentence.strip():
+                            pending.append(EXECUTOR.submit(synthesize_speech, sentence))
                 
-                # 最终输出（带或不带音频）
-                yield final_history, "", audio_path
+                try:
+                    # 流式获取文本响应
+                    for updated_history in chat_stream_response(message, history, history_tuples):
+                        audio_path = None
+                        if enable_tts and updated_history[-1]["role"] == "assistant":
+                            content = updated_history[-1]["content"]
+                            sentences, rest = split_sentences(content[spoken_len:])
+                            spoken_len = len(content) - len(rest)
+                            submit_sentences(sentences)
+                            # 只输出排在最前面且已完成的一段，保证播放顺序
+                            if pending and pending[0].done():
+                                audio_path = pending.popleft().result()
+                        state = (len(updated_history), len(updated_history[-1]["content"]))
+                        if audio_path is None and state == last_state:
+                            continue
+                        last_state = state
+                        yield updated_history, "", audio_path
+                    
+                    if not enable_tts:
+                        return
+                    
+                    # 回复结束：合成最后不带结束符的部分，再按顺序输出剩余音频
+                    if history and history[-1]["role"] == "assistant":
+                        submit_sentences([history[-1]["content"][spoken_len:]])
+                    while pending:
+                        yield history, "", pending.popleft().result()
+                finally:
+                    # 用户中断时取消尚未开始的合成任务
+                    for future in pending:
+                        future.cancel()
             
             # Enter键提交
             msg.submit(
                 fn=handle_stream_wrapper,
-                inputs=[msg, chatbot, enable_tts],
-                outputs=[chatbot, msg, audio_output]
+                inputs=[msg, chatbot, chat_history_tuples, enable_tts],
+                outputs=[chatbot, msg, audio_output],
+                concurrency_limit=8  # 远程API调用是I/O密集型，可多个会话同时进行
             )
             
             # 发送按钮
             send_btn.click(
                 fn=handle_stream_wrapper,
-                inputs=[msg, chatbot, enable_tts],
-                outputs=[chatbot, msg, audio_output]
+                inputs=[msg, chatbot, chat_history_tuples, enable_tts],
+                outputs=[chatbot, msg, audio_output],
+                concurrency_limit=8
             )
             
             # 清空按钮
             clear_btn.click(
-                fn=lambda: ([], "", None),
-                outputs=[chatbot, msg, audio_output]
+                fn=lambda: ([], [], "", None),
+                outputs=[chatbot, chat_history_tuples, msg, audio_output]
             )
         
         # ==================== Tab 2: 图像识别 ====================
@@ -559,7 +753,7 @@ def create_demo():
                             camera_input = gr.Image(
                                 label="摄像头",
                                 sources=["webcam"],  # 只允许摄像头
-                                type="numpy"
+                                type="filepath"  # 直接拿到已编码的图片文件，省去解码再编码
                             )
                         
                         # 上传图片
@@ -635,12 +829,11 @@ def create_demo():
             # ===== 事件绑定 =====
             
             # 定义统一的分析函数
-            def analyze_with_source(source_type, camera_img, upload_img, question):
+            def analyze_with_source(camera_img, upload_img, question):
                 """
-                根据图片来源进行分析
+                根据图片来源进行分析（优先使用摄像头图片）
                 
                 Args:
-                    source_type: 图片来源类型（自动判断）
                     camera_img: 摄像头图片
                     upload_img: 上传的图片
                     question: 用户问题
@@ -655,16 +848,20 @@ def create_demo():
             
             # 分析按钮点击事件
             analyze_btn.click(
-                fn=lambda c, u, q: analyze_with_source("both", c, u, q),
+                fn=analyze_with_source,
                 inputs=[camera_input, upload_input, question_input],
-                outputs=[result_output]
+                outputs=[result_output],
+                concurrency_limit=8
             )
             
             # 摄像头拍照后自动分析
-            camera_input.change(
+            # 用 input 而不是 change：只在用户确认拍照时触发，预览画面或程序更新值不会触发；
+            # trigger_mode="once" 使分析进行中的重复触发被忽略，每次拍照只调用一次VLM
+            camera_input.input(
                 fn=lambda img, q: analyze_image(img, q) if img is not None else "",
                 inputs=[camera_input, question_input],
-                outputs=[result_output]
+                outputs=[result_output],
+                trigger_mode="once"
             )
             
             # 上传图片后自动分析
@@ -700,6 +897,15 @@ def create_demo():
                                 sources=["upload"],  # 只允许上传
                                 type="filepath"
                             )
+                        
+                        # 批量上传多个音频
+                        with gr.Tab("📚 批量上传"):
+                            batch_audio_input = gr.File(
+                                label="上传多个音频文件",
+                                file_count="multiple",
+                                file_types=["audio"],
+                                type="filepath"
+                            )
                     
                     gr.Markdown("""
                     ### 💡 使用说明
@@ -713,6 +919,7 @@ def create_demo():
                        - 点击"📁上传音频"标签
                        - 拖拽或点击上传音频文件
                        - 支持 MP3, WAV, M4A, FLAC, OGG 等格式
+                       - 多个文件可在"📚批量上传"中一次上传，并发识别
                     
                     3. **语言设置**:
                        - 在右侧选择音频语言
@@ -789,13 +996,14 @@ def create_demo():
             # ===== 事件绑定 =====
             
             # 定义统一的识别函数
-            def transcribe_with_source(microphone_audio, upload_audio, language):
+            def transcribe_with_source(microphone_audio, upload_audio, batch_audio, language):
                 """
                 根据音频来源进行识别
                 
                 Args:
                     microphone_audio: 麦克风录音
                     upload_audio: 上传的音频文件
+                    batch_audio: 批量上传的音频文件列表
                     language: 语言选择
                 """
                 # 判断使用哪个音频源
@@ -803,14 +1011,17 @@ def create_demo():
                     return transcribe_audio(microphone_audio, language)
                 elif upload_audio is not None:
                     return transcribe_audio(upload_audio, language)
+                elif batch_audio:
+                    return transcribe_batch(batch_audio, language)
                 else:
                     return "⚠️ 请先录音或上传音频文件"
             
             # 识别按钮点击事件
             transcribe_btn.click(
                 fn=transcribe_with_source,
-                inputs=[microphone_input, audio_upload_input, language_selector],
-                outputs=[transcribe_output]
+                inputs=[microphone_input, audio_upload_input, batch_audio_input, language_selector],
+                outputs=[transcribe_output],
+                concurrency_limit=8
             )
             
             # 麦克风录音完成后自动识别
@@ -826,6 +1037,13 @@ def create_demo():
                 inputs=[audio_upload_input, language_selector],
                 outputs=[transcribe_output]
             )
+            
+            # 批量上传后自动并发识别
+            batch_audio_input.change(
+                fn=lambda files, lang: transcribe_batch(files, lang) if files else "",
+                inputs=[batch_audio_input, language_selector],
+                outputs=[transcribe_output]
+            )
         
         # ==================== 底部信息 ====================
         gr.Markdown("""
@@ -872,6 +1090,14 @@ def main():
         logger.info(f"🖼️ 图像识别: {settings.VLM_MODEL}")
         logger.info(f"🔗 API地址: {settings.SILICONFLOW_BASE_URL}")
         
+        # ===== 4. 后台预热HTTP连接（所有API共用同一个连接池） =====
+        threading.Thread(target=settings.warm_up_http, daemon=True).start()
+        
+        # 预先注册PIL的全部图片格式插件并编码一张小图，
+        # 让JPEG编码器（OpenCV或Pillow）在第一次分析图片前就完成初始化
+        Image.init()
+        encode_jpeg(Image.new("RGB", (8, 8)))
+        
     except ValueError as e:
         logger.error(f"❌ 配置错误: {e}")
         logger.info("💡 请按以下步骤配置:")
@@ -880,16 +1106,19 @@ def main():
         logger.info("   3. API Key获取: https://cloud.siliconflow.cn/account/ak")
         return
     
-    # ===== 4. 创建并启动Demo =====
+    # ===== 5. 创建并启动Demo =====
     demo = create_demo()
     
     logger.info("🚀 启动 Gradio 服务...")
     logger.info("=" * 60)
     
+    # 开启队列并允许并发：各Tab的请求都是远程API调用，互不阻塞
+    demo.queue(default_concurrency_limit=4, max_size=64)
+    
     demo.launch(
         server_name="127.0.0.1",
         server_port=7862,
-        share=False,
+        share=settings.GRADIO_SHARE,
         show_error=True,
         inbrowser=True
     )
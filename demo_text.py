@@ -3,7 +3,7 @@
 演示硅基流动文本对话API的使用
 """
 import gradio as gr
-from api.text_api import text_api
+from api.text_api import text_api, accumulate_stream
 from config.settings import settings
 from loguru import logger
 import sys
@@ -27,15 +27,13 @@ def convert_history_to_tuples(messages):
     Returns:
         tuples格式 [("user_msg", "bot_msg"), ...]
     """
-    history = []
-    i = 0
-    while i < len(messages):
-        if i + 1 < len(messages) and messages[i]["role"] == "user" and messages[i+1]["role"] == "assistant":
-            history.append((messages[i]["content"], messages[i+1]["content"]))
-            i += 2
-        else:
-            i += 1
-    return history
+    # 相邻的 user→assistant 两条消息组成一轮；两条相邻对不会重叠，
+    # 结果与逐条跳过未配对消息的写法相同，只是少了Python层的下标循环
+    return [
+        (user["content"], assistant["content"])
+        for user, assistant in zip(messages, messages[1:])
+        if user["role"] == "user" and assistant["role"] == "assistant"
+    ]
 
 
 def chat_response(message, history):
@@ -114,9 +112,9 @@ def chat_stream_response(message, history):
         
         # 调用流式API
         logger.info(f"用户输入(流式): {message}")
+        # 片段分批拼接后再刷新界面（刷新规则见 accumulate_stream，与多模态Demo一致）
         full_response = ""
-        for chunk in text_api.chat_stream(message=message, history=chat_history):
-            full_response += chunk
+        for full_response in accumulate_stream(text_api.chat_stream(message=message, history=chat_history)):
             history[-1]["content"] = full_response
             yield history
         
@@ -303,10 +301,13 @@ def main():
     demo = create_demo()
     
     logger.info("🚀 启动 Gradio 服务...")
+    # 开启队列并允许多个会话同时对话（远程API调用是I/O密集型）
+    demo.queue(default_concurrency_limit=8, max_size=64)
+    
     demo.launch(
         server_name="127.0.0.1",  # 本地访问（最快）
         server_port=7860,
-        share=False,              # 关闭公网分享（避免慢速）
+        share=settings.GRADIO_SHARE,  # 公网分享默认关闭（避免慢速），需要时在 .env 中开启
         show_error=True,
         inbrowser=True            # 自动打开浏览器
     )
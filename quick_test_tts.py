@@ -4,8 +4,11 @@
 """
 import requests
 import os
+import orjson
 from dotenv import load_dotenv
 
+from test._http import SESSION as _SESSION, warm_up as _warm_up
+
 # 加载环境变量
 load_dotenv()
 
@@ -14,6 +17,13 @@ API_KEY = os.getenv("SILICONFLOW_API_KEY", "")
 # 如果.env不存在，可以直接在下面填入你的API Key
 # API_KEY = "sk-xxxxxxxxxxxxxxxxx"
 
+# 请求头只构建一次
+_HEADERS = {
+    "Authorization": f"Bearer {API_KEY}",
+    "Content-Type": "application/json"
+}
+
+
 def quick_test():
     """快速测试TTS API"""
     
@@ -29,13 +39,10 @@ def quick_test():
         return
     
     print(f"✅ API Key: {API_KEY[:10]}...\n")
+    _warm_up()
     
     # 2. 构建请求
     url = "https://api.siliconflow.cn/v1/audio/speech"
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
     data = {
         "model": "fishaudio/fish-speech-1.5",
         "input": "你好，这是语音合成测试。",
@@ -51,18 +58,20 @@ def quick_test():
     # 3. 发送请求
     try:
         print("⏳ 正在发送请求...")
-        response = requests.post(url, headers=headers, json=data, timeout=30)
+        response = _SESSION.post(url, headers=_HEADERS, data=orjson.dumps(data), timeout=30, stream=True)
         
         print(f"📥 状态码: {response.status_code}\n")
         
         # 4. 处理响应
         if response.status_code == 200:
-            # 保存音频
+            # 保存音频（边接收边写盘，不在内存中缓存整段音频）
             output_file = "quick_test_output.mp3"
-            with open(output_file, 'wb') as f:
-                f.write(response.content)
+            file_size = 0
+            with open(output_file, 'wb', buffering=1 << 20) as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+                    file_size += len(chunk)
             
-            file_size = len(response.content)
             print("✅ 成功！")
             print(f"📁 音频已保存: {output_file}")
             print(f"📊 文件大小: {file_size:,} 字节 ({file_size/1024:.2f} KB)")
@@ -0,0 +1,53 @@
+"""
+测试脚本共用的HTTP会话、请求头与连接预热
+
+test/ 下的脚本直接运行（python test_xxx.py）时与本模块同目录，可直接导入：
+    from _http import API_KEY, BASE_URL, HEADERS, SESSION, warm_up
+"""
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 配置
+API_KEY = os.getenv("SILICONFLOW_API_KEY", "")
+BASE_URL = "https://api.siliconflow.cn/v1"
+
+# 请求头只构建一次
+AUTH_HEADERS = {"Authorization": f"Bearer {API_KEY}"}
+HEADERS = {**AUTH_HEADERS, "Content-Type": "application/json"}
+
+
+def make_session(retry_post: bool = True) -> requests.Session:
+    """
+    创建复用连接（HTTP keep-alive）的会话，多次请求不必每次重新建立TCP+TLS连接；
+    遇到 5xx 时按指数退避自动重试
+
+    Args:
+        retry_post: 是否也重试POST。请求体是文件句柄等发送后无法重放的数据时应传 False
+    """
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[500, 502, 503, 504],
+        allowed_methods=["GET", "POST"] if retry_post else ["GET"]
+    )
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(max_retries=retry, pool_connections=8, pool_maxsize=16))
+    return session
+
+
+SESSION = make_session()
+
+
+def warm_up(session: requests.Session = SESSION):
+    """预先建立到API的连接（DNS+TCP+TLS），后续真实请求直接复用；失败不影响测试"""
+    try:
+        session.get(f"{BASE_URL}/models", headers=AUTH_HEADERS, timeout=5)
+    except requests.exceptions.RequestException:
+        pass
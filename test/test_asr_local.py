@@ -3,22 +3,46 @@
 支持多种音频格式和语言识别
 """
 import requests
+try:
+    # 可选依赖requests_toolbelt：流式上传multipart请求体，未安装时使用requests自带的files=
+    from requests_toolbelt.multipart.encoder import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None
+from concurrent.futures import ThreadPoolExecutor
 import os
+import orjson
+import hashlib
+from functools import lru_cache
+import tempfile
 from pathlib import Path
-from dotenv import load_dotenv
 import time
+from typing import Callable
 
-# 加载环境变量
-load_dotenv()
+from _http import API_KEY, BASE_URL, make_session, warm_up
+
+# 上传音频的POST请求体是文件句柄，发送后无法重放，因此只重试GET
+_SESSION = make_session(retry_post=False)
 
 # 配置
-API_KEY = os.getenv("SILICONFLOW_API_KEY", "")
-BASE_URL = "https://api.siliconflow.cn/v1"
 OUTPUT_DIR = "../outputs/audio"
+ASR_CACHE_DIR = "../outputs/asr_cache"
 
 # 确保输出目录存在
-Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+os.makedirs(ASR_CACHE_DIR, exist_ok=True)
+
+# 输出分隔线
+_SEP = "=" * 70
 
+# 音频扩展名对应的MIME类型（未列出的扩展名按 audio/mpeg 上传，与 api/asr_api.py 一致）
+_MIME = {
+    '.mp3': 'audio/mpeg',
+    '.wav': 'audio/wav',
+    '.m4a': 'audio/m4a',
+    '.flac': 'audio/flac',
+    '.ogg': 'audio/ogg',
+    '.webm': 'audio/webm'
+}
 
 # 支持的ASR模型列表
 SUPPORTED_MODELS = {
@@ -27,11 +51,98 @@ SUPPORTED_MODELS = {
 }
 
 
+def _suffix_mime(suffix: str) -> str:
+    """根据扩展名获取MIME类型"""
+    return _MIME.get(suffix, 'audio/mpeg')
+
+
+@lru_cache(maxsize=64)
+def _hash_file(path: str, mtime: float, size: int) -> str:
+    """计算音频文件的SHA-256（mtime/size 参与缓存键，文件变化后自动重新计算）"""
+    h = hashlib.sha256()
+    with open(path, 'rb', buffering=1 << 20) as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _audio_hash(path: str) -> str:
+    """获取音频内容哈希，同一进程内重复调用不重复读文件"""
+    stat = os.stat(path)
+    return _hash_file(path, stat.st_mtime, stat.st_size)
+
+
+def _text_details(body: str):
+    """text格式：响应体即识别文本"""
+    return body, [f"📊 文本长度: {len(body)} 字符"]
+
+
+def _json_details(body: str):
+    """json格式：只取识别文本"""
+    text = orjson.loads(body).get('text', '')
+    return text, [f"📊 文本长度: {len(text)} 字符"]
+
+
+def _verbose_details(body: str):
+    """verbose_json格式：识别文本及语言、时长、时间戳等详细信息"""
+    result = orjson.loads(body)
+    
+    text = result.get('text', '')
+    language_detected = result.get('language', 'unknown')
+    duration = result.get('duration', 0)
+    segments = result.get('segments', [])
+    
+    lines = [
+        "📊 详细信息:",
+        f"   - 检测语言: {language_detected}",
+        f"   - 音频时长: {duration:.2f}秒",
+        f"   - 文本长度: {len(text)} 字符",
+        f"   - 片段数量: {len(segments)}",
+    ]
+    
+    if segments:
+        lines.append("\n⏱️  时间戳信息:")
+        for i, seg in enumerate(segments[:5], 1):  # 只显示前5个片段
+            start = seg.get('start', 0)
+            end = seg.get('end', 0)
+            seg_text = seg.get('text', '')
+            lines.append(f"   {i}. [{start:.1f}s - {end:.1f}s] {seg_text}")
+        if len(segments) > 5:
+            lines.append(f"   ... 还有 {len(segments) - 5} 个片段")
+    
+    return text, lines
+
+
+# 各响应格式的解析函数，未列出的格式按 json 处理
+_RENDERERS = {
+    "text": _text_details,
+    "json": _json_details,
+    "verbose_json": _verbose_details,
+}
+
+
+def _print_transcription(body: str, response_format: str, emit: Callable[[str], None] = print):
+    """打印识别结果（body 为接口返回的原始响应文本）"""
+    text, details = _RENDERERS.get(response_format, _json_details)(body)
+    
+    emit(f"\n{_SEP}")
+    emit(f"✅ 识别成功!")
+    emit(_SEP)
+    emit(f"\n📝 识别文本:\n")
+    emit(text)
+    emit(f"\n{_SEP}")
+    for line in details:
+        emit(line)
+    emit(_SEP)
+
+
 def test_asr_transcription(
     audio_path: str,
     model: str = "FunAudioLLM/SenseVoiceSmall",
     language: str = "auto",
-    response_format: str = "json"
+    response_format: str = "json",
+    refresh: bool = False,
+    emit: Callable[[str], None] = print
 ):
     """
     测试语音识别API
@@ -41,67 +152,73 @@ def test_asr_transcription(
         model: ASR模型名称
         language: 指定语言（auto/zh/en/ja/yue等）
         response_format: 响应格式（json/text/verbose_json）
+        refresh: 忽略识别缓存，强制重新调用API（结果仍会写回缓存）
+        emit: 输出函数，默认直接打印；并发运行时传入各自缓冲区的 append，结束后再整块输出
         
     Returns:
         bool: 是否成功
     """
-    print(f"\n{'='*70}")
-    print(f"🎤 语音识别测试")
-    print(f"{'='*70}")
-    print(f"📝 模型: {model}")
-    print(f"🎵 音频: {audio_path}")
-    print(f"🌐 语言: {language}")
-    print(f"📋 格式: {response_format}")
-    print(f"{'='*70}")
+    emit(f"\n{_SEP}")
+    emit(f"🎤 语音识别测试")
+    emit(_SEP)
+    emit(f"📝 模型: {model}")
+    emit(f"🎵 音频: {audio_path}")
+    emit(f"🌐 语言: {language}")
+    emit(f"📋 格式: {response_format}")
+    emit(_SEP)
     
     # 检查API Key
     if not API_KEY or API_KEY == "your_api_key_here":
-        print("❌ 错误: API Key未配置！")
-        print("请在 .env 文件中设置 SILICONFLOW_API_KEY")
-        print("获取地址: https://cloud.siliconflow.cn/account/ak")
+        emit("❌ 错误: API Key未配置！")
+        emit("请在 .env 文件中设置 SILICONFLOW_API_KEY")
+        emit("获取地址: https://cloud.siliconflow.cn/account/ak")
         return False
     
     # 处理音频文件
+    audio_fh = None
+    cache_path = None
     if audio_path.startswith(('http://', 'https://')):
         # 网络音频URL
-        print(f"📡 使用网络音频: {audio_path[:60]}...")
+        emit(f"📡 使用网络音频: {audio_path[:60]}...")
         try:
-            print("⏳ 正在下载音频...")
-            response = requests.get(audio_path, timeout=30)
+            emit("⏳ 正在下载音频...")
+            response = _SESSION.get(audio_path, timeout=30, stream=True)
             response.raise_for_status()
-            audio_data = response.content
-            audio_file = ("audio.mp3", audio_data, "audio/mpeg")
+            # 小文件留在内存，超过阈值自动落盘，避免整段音频常驻内存
+            audio_fh = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                audio_fh.write(chunk)
+            audio_fh.seek(0)
+            audio_file = ("audio.mp3", audio_fh, "audio/mpeg")
         except Exception as e:
-            print(f"❌ 音频下载失败: {str(e)}")
+            emit(f"❌ 音频下载失败: {str(e)}")
             return False
     else:
         # 本地音频文件
         if not os.path.exists(audio_path):
-            print(f"❌ 错误: 音频文件不存在: {audio_path}")
+            emit(f"❌ 错误: 音频文件不存在: {audio_path}")
             return False
         
-        print(f"📁 使用本地音频: {audio_path}")
+        emit(f"📁 使用本地音频: {audio_path}")
         
-        # 检测文件格式
-        file_ext = Path(audio_path).suffix.lower()
-        mime_types = {
-            '.mp3': 'audio/mpeg',
-            '.wav': 'audio/wav',
-            '.m4a': 'audio/m4a',
-            '.flac': 'audio/flac',
-            '.ogg': 'audio/ogg',
-            '.webm': 'audio/webm'
-        }
-        mime_type = mime_types.get(file_ext, 'audio/mpeg')
+        # 相同音频内容+参数已识别过则直接读取缓存结果，跳过上传和请求
+        cache_key = "_".join([_audio_hash(audio_path), model.replace('/', '_'), language, response_format])
+        cache_path = os.path.join(ASR_CACHE_DIR, f"{cache_key}.json")
+        if not refresh and os.path.exists(cache_path):
+            emit(f"💾 命中识别缓存（加 --refresh 参数重新调用API）: {cache_path}")
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                _print_transcription(f.read(), response_format, emit)
+            return True
         
-        # 读取文件
-        with open(audio_path, 'rb') as f:
-            audio_data = f.read()
+        # 检测文件格式
+        mime_type = _suffix_mime(os.path.splitext(audio_path)[1].lower())
         
-        file_size = len(audio_data) / (1024 * 1024)
-        print(f"📦 文件大小: {file_size:.2f} MB")
+        file_size = os.path.getsize(audio_path) / (1024 * 1024)
+        emit(f"📦 文件大小: {file_size:.2f} MB")
         
-        audio_file = (Path(audio_path).name, audio_data, mime_type)
+        # 传入打开的文件句柄而不是整段读入的 bytes
+        audio_fh = open(audio_path, 'rb')
+        audio_file = (Path(audio_path).name, audio_fh, mime_type)
     
     # 构建请求
     url = f"{BASE_URL}/audio/transcriptions"
@@ -124,138 +241,103 @@ def test_asr_transcription(
     if response_format:
         data['response_format'] = response_format
     
-    print(f"\n📤 发送请求到: {url}")
-    print(f"📦 请求参数: {data}")
+    emit(f"\n📤 发送请求到: {url}")
+    emit(f"📦 请求参数: {data}")
     
     try:
         # 发送POST请求
         start_time = time.time()
-        response = requests.post(
-            url,
-            headers=headers,
-            files=files,
-            data=data,
-            timeout=120
-        )
+        if MultipartEncoder is not None:
+            # 边读文件边发送，请求体不在内存中整体拼装
+            body = MultipartEncoder(fields={**data, 'file': audio_file})
+            response = _SESSION.post(
+                url,
+                headers={**headers, "Content-Type": body.content_type},
+                data=body,
+                timeout=120
+            )
+        else:
+            response = _SESSION.post(
+                url,
+                headers=headers,
+                files=files,
+                data=data,
+                timeout=120
+            )
         elapsed_time = time.time() - start_time
         
-        print(f"\n⏱️  响应时间: {elapsed_time:.2f}秒")
-        print(f"📊 状态码: {response.status_code}")
+        emit(f"\n⏱️  响应时间: {elapsed_time:.2f}秒")
+        emit(f"📊 状态码: {response.status_code}")
         
         # 检查响应
         if response.status_code == 200:
             # 解析结果
-            if response_format == "text":
-                text = response.text
-                
-                print(f"\n{'='*70}")
-                print(f"✅ 识别成功!")
-                print(f"{'='*70}")
-                print(f"\n📝 识别文本:\n")
-                print(text)
-                print(f"\n{'='*70}")
-                print(f"📊 文本长度: {len(text)} 字符")
-                print(f"{'='*70}")
-                
-            elif response_format == "verbose_json":
-                result = response.json()
-                
-                text = result.get('text', '')
-                language_detected = result.get('language', 'unknown')
-                duration = result.get('duration', 0)
-                segments = result.get('segments', [])
-                
-                print(f"\n{'='*70}")
-                print(f"✅ 识别成功!")
-                print(f"{'='*70}")
-                print(f"\n📝 识别文本:\n")
-                print(text)
-                print(f"\n{'='*70}")
-                print(f"📊 详细信息:")
-                print(f"   - 检测语言: {language_detected}")
-                print(f"   - 音频时长: {duration:.2f}秒")
-                print(f"   - 文本长度: {len(text)} 字符")
-                print(f"   - 片段数量: {len(segments)}")
-                
-                if segments and len(segments) > 0:
-                    print(f"\n⏱️  时间戳信息:")
-                    for i, seg in enumerate(segments[:5], 1):  # 只显示前5个片段
-                        start = seg.get('start', 0)
-                        end = seg.get('end', 0)
-                        seg_text = seg.get('text', '')
-                        print(f"   {i}. [{start:.1f}s - {end:.1f}s] {seg_text}")
-                    if len(segments) > 5:
-                        print(f"   ... 还有 {len(segments) - 5} 个片段")
-                
-                print(f"{'='*70}")
-                
-            else:
-                # JSON格式
-                result = response.json()
-                text = result.get('text', '')
-                
-                print(f"\n{'='*70}")
-                print(f"✅ 识别成功!")
-                print(f"{'='*70}")
-                print(f"\n📝 识别文本:\n")
-                print(text)
-                print(f"\n{'='*70}")
-                print(f"📊 文本长度: {len(text)} 字符")
-                print(f"{'='*70}")
+            _print_transcription(response.text, response_format, emit)
+            
+            # 缓存识别结果，相同音频+参数再次测试时直接读取
+            if cache_path:
+                tmp_path = f"{cache_path}.part"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(response.text)
+                os.replace(tmp_path, cache_path)
             
             return True
             
         elif response.status_code == 403:
-            print(f"\n❌ 403 Forbidden - 权限错误")
-            print(f"可能原因:")
-            print(f"  1. API Key 没有访问该模型的权限")
-            print(f"  2. 账户余额不足")
-            print(f"\n建议:")
-            print(f"  1. 检查 API Key 权限: https://cloud.siliconflow.cn/account/ak")
-            print(f"  2. 查看账户余额: https://cloud.siliconflow.cn/account/billing")
+            emit(f"\n❌ 403 Forbidden - 权限错误")
+            emit(f"可能原因:")
+            emit(f"  1. API Key 没有访问该模型的权限")
+            emit(f"  2. 账户余额不足")
+            emit(f"\n建议:")
+            emit(f"  1. 检查 API Key 权限: https://cloud.siliconflow.cn/account/ak")
+            emit(f"  2. 查看账户余额: https://cloud.siliconflow.cn/account/billing")
             return False
             
         elif response.status_code == 404:
-            print(f"\n❌ 404 Not Found - 模型不存在")
-            print(f"模型名称可能不正确: {model}")
-            print(f"\n支持的模型:")
+            emit(f"\n❌ 404 Not Found - 模型不存在")
+            emit(f"模型名称可能不正确: {model}")
+            emit(f"\n支持的模型:")
             for key, value in SUPPORTED_MODELS.items():
-                print(f"  - {value}")
+                emit(f"  - {value}")
             return False
             
         elif response.status_code == 400:
-            print(f"\n❌ 400 Bad Request - 请求参数错误")
+            emit(f"\n❌ 400 Bad Request - 请求参数错误")
             try:
-                error_detail = response.json()
-                print(f"错误详情: {error_detail}")
+                error_detail = orjson.loads(response.content)
+                emit(f"错误详情: {error_detail}")
             except:
-                print(f"错误信息: {response.text}")
-            print(f"\n检查项:")
-            print(f"  1. 音频文件格式是否支持（mp3/wav/m4a/flac/ogg/webm）")
-            print(f"  2. 音频文件是否损坏")
-            print(f"  3. 文件大小是否超出限制（建议<25MB）")
+                emit(f"错误信息: {response.text}")
+            emit(f"\n检查项:")
+            emit(f"  1. 音频文件格式是否支持（mp3/wav/m4a/flac/ogg/webm）")
+            emit(f"  2. 音频文件是否损坏")
+            emit(f"  3. 文件大小是否超出限制（建议<25MB）")
             return False
             
         else:
-            print(f"\n❌ 请求失败: {response.status_code}")
-            print(f"错误信息: {response.text}")
+            emit(f"\n❌ 请求失败: {response.status_code}")
+            emit(f"错误信息: {response.text}")
             return False
             
     except requests.exceptions.Timeout:
-        print("\n❌ 请求超时")
-        print("建议: 检查网络连接或使用更小的音频文件")
+        emit("\n❌ 请求超时")
+        emit("建议: 检查网络连接或使用更小的音频文件")
         return False
         
     except Exception as e:
-        print(f"\n❌ 发生错误: {str(e)}")
+        emit(f"\n❌ 发生错误: {str(e)}")
         return False
+    
+    finally:
+        if audio_fh is not None:
+            audio_fh.close()
 
 
-def test_multiple_languages():
+def test_multiple_languages(refresh: bool = False):
     """测试多语言识别"""
-    print(f"\n{'='*70}")
+    print(f"\n{_SEP}")
     print(f"🌐 多语言识别测试")
-    print(f"{'='*70}")
+    print(_SEP)
     
     # 测试用例（需要准备对应的音频文件）
     test_cases = [
@@ -276,51 +358,63 @@ def test_multiple_languages():
         }
     ]
     
-    results = []
-    
-    for test in test_cases:
-        print(f"\n🧪 {test['name']}")
+    def run(test):
+        lines = [f"\n🧪 {test['name']}"]
         
         if not os.path.exists(test['audio']):
-            print(f"⚠️  跳过: 音频文件不存在 ({test['audio']})")
-            results.append(False)
-            continue
+            lines.append(f"⚠️  跳过: 音频文件不存在 ({test['audio']})")
+            return False, lines
         
-        success = test_asr_transcription(
+        ok = test_asr_transcription(
             audio_path=test['audio'],
-            language=test['language']
+            language=test['language'],
+            refresh=refresh,
+            emit=lines.append
         )
-        results.append(success)
-        
-        # 间隔
-        if test != test_cases[-1]:
-            print(f"\n⏳ 等待2秒...")
-            time.sleep(2)
+        return ok, lines
+    
+    # 各用例互不依赖，并发识别（共用 _SESSION 的连接池），总耗时约等于最慢的一个用例；
+    # 每个用例的输出先写入各自的缓冲，再按用例顺序整块打印，日志不会穿插
+    results = []
+    with ThreadPoolExecutor(max_workers=len(test_cases)) as executor:
+        for ok, lines in executor.map(run, test_cases):
+            print("\n".join(lines))
+            results.append(ok)
     
     # 总结
-    print(f"\n{'='*70}")
+    print(f"\n{_SEP}")
     print(f"📊 测试总结")
-    print(f"{'='*70}")
+    print(_SEP)
     print(f"总测试数: {len(results)}")
     print(f"成功: {sum(results)} ✅")
     print(f"失败: {len(results) - sum(results)} ❌")
-    print(f"{'='*70}")
+    print(_SEP)
+
+
+# 交互式测试的编号选项
+_MODEL_OPTS = {str(i): model for i, model in enumerate(SUPPORTED_MODELS.values(), 1)}
+_LANG_OPTS = {"1": "auto", "2": "zh", "3": "en", "4": "ja", "5": "yue"}
+_FORMAT_OPTS = {"1": "json", "2": "text", "3": "verbose_json"}
 
 
-def interactive_test():
+def _choose(prompt: str, options: dict, default: int):
+    """读取编号选择，空输入或无效编号时使用默认项"""
+    answer = input(prompt).strip() or str(default)
+    return options.get(answer, options[str(default)])
+
+
+def interactive_test(refresh: bool = False):
     """交互式测试"""
-    print("\n" + "="*70)
+    print("\n" + _SEP)
     print("🎤 语音识别交互式测试")
-    print("="*70)
+    print(_SEP)
     
     # 选择模型
     print("\n可用模型:")
     for i, (key, model) in enumerate(SUPPORTED_MODELS.items(), 1):
         print(f"  {i}. {model}")
     
-    model_choice = input("\n选择模型 (1-2, 默认1): ").strip() or "1"
-    model_index = int(model_choice) - 1
-    model = list(SUPPORTED_MODELS.values())[model_index] if 0 <= model_index < len(SUPPORTED_MODELS) else "FunAudioLLM/SenseVoiceSmall"
+    model = _choose(f"\n选择模型 (1-{len(_MODEL_OPTS)}, 默认1): ", _MODEL_OPTS, 1)
     
     # 输入音频
     print("\n音频来源:")
@@ -342,9 +436,7 @@ def interactive_test():
     print("  4. ja - 日语")
     print("  5. yue - 粤语")
     
-    lang_choice = input("\n选择语言 (1-5, 默认1): ").strip() or "1"
-    languages = ["auto", "zh", "en", "ja", "yue"]
-    language = languages[int(lang_choice) - 1] if lang_choice.isdigit() and 1 <= int(lang_choice) <= 5 else "auto"
+    language = _choose("\n选择语言 (1-5, 默认1): ", _LANG_OPTS, 1)
     
     # 响应格式
     print("\n响应格式:")
@@ -352,24 +444,23 @@ def interactive_test():
     print("  2. text - 纯文本")
     print("  3. verbose_json - 详细JSON（含时间戳）")
     
-    format_choice = input("\n选择格式 (1-3, 默认1): ").strip() or "1"
-    formats = ["json", "text", "verbose_json"]
-    response_format = formats[int(format_choice) - 1] if format_choice.isdigit() and 1 <= int(format_choice) <= 3 else "json"
+    response_format = _choose("\n选择格式 (1-3, 默认1): ", _FORMAT_OPTS, 1)
     
     # 执行测试
     test_asr_transcription(
         audio_path=audio_path,
         model=model,
         language=language,
-        response_format=response_format
+        response_format=response_format,
+        refresh=refresh
     )
 
 
 def quick_test_with_sample():
     """使用在线样例音频快速测试"""
-    print("\n" + "="*70)
+    print("\n" + _SEP)
     print("🚀 快速测试（使用在线样例音频）")
-    print("="*70)
+    print(_SEP)
     
     # 使用公开的测试音频URL
     sample_audio_urls = [
@@ -379,42 +470,53 @@ def quick_test_with_sample():
     
     print("\n正在使用在线样例音频进行测试...")
     
-    for i, url in enumerate(sample_audio_urls, 1):
-        print(f"\n测试 {i}/{len(sample_audio_urls)}")
+    def run(url):
+        lines = []
         test_asr_transcription(
             audio_path=url,
             language="auto",
-            response_format="json"
+            response_format="json",
+            emit=lines.append
         )
-        
-        if i < len(sample_audio_urls):
-            time.sleep(2)
+        return lines
+    
+    # 每个样例的下载+识别互不依赖，并发执行（共用 _SESSION 的连接池），输出按样例顺序整块打印
+    with ThreadPoolExecutor(max_workers=min(8, len(sample_audio_urls))) as executor:
+        for lines in executor.map(run, sample_audio_urls):
+            print("\n".join(lines))
 
 
 if __name__ == "__main__":
     import sys
     
-    print("\n" + "="*70)
+    print("\n" + _SEP)
     print("🎤 硅基流动语音识别 API 测试工具")
-    print("="*70)
+    print(_SEP)
     print("\n使用方式:")
     print("  1. python test_asr_local.py                    # 快速测试")
     print("  2. python test_asr_local.py interactive        # 交互式测试")
     print("  3. python test_asr_local.py <audio_path>       # 测试指定音频")
     print("  4. python test_asr_local.py multilang          # 多语言测试")
+    print("  以上均可追加 --refresh，忽略识别缓存重新调用API")
+    
+    warm_up(_SESSION)
+    
+    refresh = "--refresh" in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != "--refresh"]
     
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "interactive":
-            interactive_test()
-        elif sys.argv[1] == "multilang":
-            test_multiple_languages()
+    if args:
+        if args[0] == "interactive":
+            interactive_test(refresh=refresh)
+        elif args[0] == "multilang":
+            test_multiple_languages(refresh=refresh)
         else:
             # 快速测试指定音频
-            audio_path = sys.argv[1]
-            language = sys.argv[2] if len(sys.argv) > 2 else "auto"
+            audio_path = args[0]
+            language = args[1] if len(args) > 1 else "auto"
             test_asr_transcription(
                 audio_path=audio_path,
-                language=language
+                language=language,
+                refresh=refresh
             )
     else:
         # 默认：快速测试
@@ -2,34 +2,30 @@
 文本API测试脚本 - 快速验证硅基流动API调用
 """
 import requests
-import json
-import os
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import orjson
 
-# 加载环境变量
-load_dotenv()
+from _http import API_KEY, BASE_URL, HEADERS as _HEADERS, SESSION as _SESSION, warm_up as _warm_up
 
 
-def test_text_api():
-    """测试文本对话API"""
+def test_text_api(concurrency: int = 3):
+    """
+    测试文本对话API
     
-    # 配置
-    api_key = os.getenv("SILICONFLOW_API_KEY", "")
-    if not api_key:
+    Args:
+        concurrency: 同时发出的请求数上限（注意服务商的限流）
+    """
+    
+    if not API_KEY:
         print("❌ 错误: 未找到 SILICONFLOW_API_KEY")
         print("💡 请创建 .env 文件并配置: SILICONFLOW_API_KEY=你的密钥")
         print("🔗 获取地址: https://cloud.siliconflow.cn/account/ak")
         return
     
-    base_url = "https://api.siliconflow.cn/v1"
+    base_url = BASE_URL
     model = "Qwen/Qwen2.5-7B-Instruct"
     
-    # 请求头
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
     # 测试问题
     test_messages = [
         "你好，请介绍一下你自己",
@@ -44,8 +40,29 @@ def test_text_api():
     print(f"🔗 API地址: {base_url}")
     print("=" * 80)
     
-    # 测试每个问题
-    for i, message in enumerate(test_messages, 1):
+    url = f"{base_url}/chat/completions"
+    
+    def ask(message):
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": "user", "content": message}
+            ],
+            "max_tokens": 2048,
+            "temperature": 0.7,
+            "top_p": 0.7,
+            "stream": False
+        }
+        return _SESSION.post(url, data=orjson.dumps(payload), headers=_HEADERS, timeout=60)
+    
+    # 各问题互不依赖，先并发发出全部请求，总耗时约等于最慢的一个
+    print("⏳ 正在调用API...")
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    futures = [executor.submit(ask, message) for message in test_messages]
+    executor.shutdown(wait=False)
+    
+    # 按问题顺序输出结果
+    for i, (message, future) in enumerate(zip(test_messages, futures), 1):
         print(f"\n{'='*80}")
         print(f"测试 {i}/{len(test_messages)}")
         print(f"{'='*80}")
@@ -53,26 +70,12 @@ def test_text_api():
         print("-" * 80)
         
         try:
-            # 构建请求
-            url = f"{base_url}/chat/completions"
-            payload = {
-                "model": model,
-                "messages": [
-                    {"role": "user", "content": message}
-                ],
-                "max_tokens": 2048,
-                "temperature": 0.7,
-                "top_p": 0.7,
-                "stream": False
-            }
-            
-            # 发送请求
-            print("⏳ 正在调用API...")
-            response = requests.post(url, json=payload, headers=headers, timeout=60)
+            # 等待该问题的响应（请求异常会在这里重新抛出）
+            response = future.result()
             
             # 检查响应
             if response.status_code == 200:
-                result = response.json()
+                result = orjson.loads(response.content)
                 
                 # 提取回复
                 reply = result["choices"][0]["message"]["content"]
@@ -100,7 +103,7 @@ def test_text_api():
             print("❌ 请求超时!")
         except requests.exceptions.RequestException as e:
             print(f"❌ 网络错误: {e}")
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             print(f"❌ JSON解析错误: {e}")
         except Exception as e:
             print(f"❌ 未知错误: {e}")
@@ -110,23 +113,44 @@ def test_text_api():
     print("=" * 80)
 
 
+def _handle_event(event: bytes) -> bool:
+    """
+    处理单个SSE事件并输出增量内容（不立即flush），收到 [DONE] 时返回 True
+
+    data 字段的解析规则与 api/sse.py 的 _event_data 一致："data:" 后的空格可有可无，
+    多行 data 以换行拼接，没有 data 字段的事件（注释、心跳）直接忽略
+    """
+    data_lines = [
+        line[5:].lstrip(b" ")
+        for line in event.split(b"\n")
+        if line.startswith(b"data:")
+    ]
+    if not data_lines:
+        return False
+    data = b"\n".join(data_lines)
+    if data == b"[DONE]":
+        return True
+    try:
+        chunk = orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return False
+    if chunk.get('choices'):
+        content = chunk['choices'][0].get('delta', {}).get('content', '')
+        if content:
+            sys.stdout.write(content)
+    return False
+
+
 def test_stream_api():
     """测试流式输出API"""
     
-    # 配置
-    api_key = os.getenv("SILICONFLOW_API_KEY", "")
-    if not api_key:
+    if not API_KEY:
         print("❌ 错误: 未找到 SILICONFLOW_API_KEY")
         return
     
-    base_url = "https://api.siliconflow.cn/v1"
+    base_url = BASE_URL
     model = "Qwen/Qwen2.5-7B-Instruct"
     
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
     print("\n" + "=" * 80)
     print("⚡ 流式输出测试")
     print("=" * 80)
@@ -146,25 +170,25 @@ def test_stream_api():
             "stream": True
         }
         
-        response = requests.post(url, json=payload, headers=headers, timeout=60, stream=True)
+        response = _SESSION.post(url, data=orjson.dumps(payload), headers=_HEADERS, timeout=60, stream=True)
         
         if response.status_code == 200:
-            for line in response.iter_lines():
-                if line:
-                    line_str = line.decode('utf-8')
-                    if line_str.startswith('data: '):
-                        data = line_str[6:]
-                        if data == '[DONE]':
-                            break
-                        try:
-                            chunk = json.loads(data)
-                            if 'choices' in chunk and len(chunk['choices']) > 0:
-                                delta = chunk['choices'][0].get('delta', {})
-                                content = delta.get('content', '')
-                                if content:
-                                    print(content, end="", flush=True)
-                        except json.JSONDecodeError:
-                            continue
+            # 按大块读取，在缓冲区里以空行切分出完整的SSE事件
+            buffer = bytearray()
+            done = False
+            for raw in response.iter_content(chunk_size=4096):
+                buffer += raw.replace(b"\r", b"")
+                while not done:
+                    end = buffer.find(b"\n\n")
+                    if end == -1:
+                        break
+                    event = bytes(buffer[:end])
+                    del buffer[:end + 2]
+                    done = _handle_event(event)
+                # 每个网络块只刷新一次输出，而不是每个token一次系统调用
+                sys.stdout.flush()
+                if done:
+                    break
             
             print("\n" + "-" * 80)
             print("✅ 流式测试成功!")
@@ -179,6 +203,8 @@ def test_stream_api():
 
 
 if __name__ == "__main__":
+    _warm_up()
+    
     # 运行普通测试
     test_text_api()
     
@@ -3,20 +3,25 @@
 支持多种模型和参数配置
 """
 import requests
+from concurrent.futures import ThreadPoolExecutor
 import os
-from pathlib import Path
-from dotenv import load_dotenv
+import gzip
+import orjson
+from typing import Callable
 
-# 加载环境变量
-load_dotenv()
+from _http import API_KEY, BASE_URL, HEADERS as _HEADERS, SESSION as _SESSION, warm_up as _warm_up
 
 # 配置
-API_KEY = os.getenv("SILICONFLOW_API_KEY", "")
-BASE_URL = "https://api.siliconflow.cn/v1"
 OUTPUT_DIR = "../outputs/audio"
 
+_GZIP_HEADERS = {**_HEADERS, "Content-Encoding": "gzip"}
+
+# 请求体超过该大小（字节）时先尝试gzip压缩上传，短文本压缩反而更大
+_GZIP_MIN_BYTES = 1024
+
+
 # 确保输出目录存在
-Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
+os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
 def test_tts_synthesis(
@@ -25,7 +30,8 @@ def test_tts_synthesis(
     voice: str = "fnlp/MOSS-TTSD-v0.5:alex", # 带上模型名字写，最好去找枚举，否则一直报400.
     response_format: str = "mp3",
     speed: float = 1.0,
-    output_filename: str = None
+    output_filename: str = None,
+    emit: Callable[[str], None] = print
 ):
     """
     测试TTS语音合成
@@ -37,30 +43,27 @@ def test_tts_synthesis(
         response_format: 音频格式 (mp3/wav/opus/pcm)
         speed: 语速 (0.25-4.0)
         output_filename: 输出文件名（可选）
+        emit: 输出函数，默认直接打印；并发运行时传入各自缓冲区的 append，结束后再整块输出
     
     Returns:
         bool: 是否成功
     """
-    print(f"\n{'='*60}")
-    print(f"🎤 测试模型: {model}")
-    print(f"📝 输入文本: {text}")
-    print(f"🔊 发音人: {voice}")
-    print(f"⚡ 语速: {speed}x")
-    print(f"{'='*60}")
+    emit(f"\n{'='*60}")
+    emit(f"🎤 测试模型: {model}")
+    emit(f"📝 输入文本: {text}")
+    emit(f"🔊 发音人: {voice}")
+    emit(f"⚡ 语速: {speed}x")
+    emit(f"{'='*60}")
     
     # 检查API Key
     if not API_KEY or API_KEY == "your_api_key_here":
-        print("❌ 错误: API Key未配置！")
-        print("请在 .env 文件中设置 SILICONFLOW_API_KEY")
-        print("获取地址: https://cloud.siliconflow.cn/account/ak")
+        emit("❌ 错误: API Key未配置！")
+        emit("请在 .env 文件中设置 SILICONFLOW_API_KEY")
+        emit("获取地址: https://cloud.siliconflow.cn/account/ak")
         return False
     
     # 构建请求
     url = f"{BASE_URL}/audio/speech"
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
     
     # 根据不同模型构建请求数据
     if "fish-speech" in model:
@@ -90,19 +93,37 @@ def test_tts_synthesis(
             "speed": speed
         }
     
-    print(f"\n📤 发送请求到: {url}")
-    print(f"📦 请求参数: {data}")
+    emit(f"\n📤 发送请求到: {url}")
+    emit(f"📦 请求参数: {data}")
     
     try:
+        # orjson 直接输出UTF-8，中文不转义为 \uXXXX，请求体更小
+        body = orjson.dumps(data)
+        response = None
+        if len(body) >= _GZIP_MIN_BYTES:
+            # 长文本压缩后上传；服务端不支持压缩请求体时回退到未压缩
+            response = _SESSION.post(
+                url,
+                headers=_GZIP_HEADERS,
+                data=gzip.compress(body, compresslevel=1),
+                timeout=60,
+                stream=True
+            )
+            if response.status_code in (400, 415):
+                response.close()
+                response = None
+        
         # 发送POST请求
-        response = requests.post(
-            url,
-            headers=headers,
-            json=data,
-            timeout=60
-        )
+        if response is None:
+            response = _SESSION.post(
+                url,
+                headers=_HEADERS,
+                data=body,
+                timeout=60,
+                stream=True
+            )
         
-        print(f"📥 响应状态码: {response.status_code}")
+        emit(f"📥 响应状态码: {response.status_code}")
         
         # 检查响应
         if response.status_code == 200:
@@ -113,46 +134,48 @@ def test_tts_synthesis(
             
             output_path = os.path.join(OUTPUT_DIR, f"{output_filename}.{response_format}")
             
-            # 保存音频文件
-            with open(output_path, 'wb') as f:
-                f.write(response.content)
+            # 边接收边写盘，不在内存中缓存整段音频
+            file_size = 0
+            with open(output_path, 'wb', buffering=1 << 20) as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+                    file_size += len(chunk)
             
-            file_size = len(response.content)
-            print(f"✅ 成功！音频已保存")
-            print(f"📁 文件路径: {output_path}")
-            print(f"📊 文件大小: {file_size:,} 字节 ({file_size/1024:.2f} KB)")
+            emit(f"✅ 成功！音频已保存")
+            emit(f"📁 文件路径: {output_path}")
+            emit(f"📊 文件大小: {file_size:,} 字节 ({file_size/1024:.2f} KB)")
             return True
             
         else:
-            print(f"❌ 请求失败！")
-            print(f"状态码: {response.status_code}")
-            print(f"错误信息: {response.text}")
+            emit(f"❌ 请求失败！")
+            emit(f"状态码: {response.status_code}")
+            emit(f"错误信息: {response.text}")
             
             # 提供具体的错误提示
             if response.status_code == 403:
-                print("\n💡 提示:")
-                print("  - 403错误通常表示API Key无效或没有权限")
-                print("  - 请检查 .env 文件中的 SILICONFLOW_API_KEY")
-                print("  - 确保API Key有TTS服务的访问权限")
+                emit("\n💡 提示:")
+                emit("  - 403错误通常表示API Key无效或没有权限")
+                emit("  - 请检查 .env 文件中的 SILICONFLOW_API_KEY")
+                emit("  - 确保API Key有TTS服务的访问权限")
             elif response.status_code == 401:
-                print("\n💡 提示:")
-                print("  - 401错误表示认证失败")
-                print("  - 请确认API Key格式正确")
+                emit("\n💡 提示:")
+                emit("  - 401错误表示认证失败")
+                emit("  - 请确认API Key格式正确")
             elif response.status_code == 400:
-                print("\n💡 提示:")
-                print("  - 400错误表示请求参数有误")
-                print("  - 请检查模型名称、文本内容等参数")
+                emit("\n💡 提示:")
+                emit("  - 400错误表示请求参数有误")
+                emit("  - 请检查模型名称、文本内容等参数")
             
             return False
             
     except requests.exceptions.Timeout:
-        print("❌ 请求超时！请检查网络连接")
+        emit("❌ 请求超时！请检查网络连接")
         return False
     except requests.exceptions.ConnectionError:
-        print("❌ 连接失败！请检查网络连接")
+        emit("❌ 连接失败！请检查网络连接")
         return False
     except Exception as e:
-        print(f"❌ 发生错误: {str(e)}")
+        emit(f"❌ 发生错误: {str(e)}")
         return False
 
 
@@ -191,16 +214,25 @@ def test_different_speeds():
     print("🎵 测试不同语速")
     print(f"{'='*60}")
     
-    results = []
-    for speed in speeds:
-        result = test_tts_synthesis(
+    # 各语速的请求互不依赖，并发发送（共用 _SESSION 的连接池），总耗时约等于最慢的一次请求；
+    # 每个请求的输出先写入各自的缓冲，再按语速顺序整块打印，日志不会穿插
+    def synthesize(speed):
+        lines = []
+        ok = test_tts_synthesis(
             text=text,
             model="fishaudio/fish-speech-1.5",
             voice="alex",
             speed=speed,
-            output_filename=f"tts_speed_{speed}"
+            output_filename=f"tts_speed_{speed}",
+            emit=lines.append
         )
-        results.append((speed, result))
+        return ok, lines
+    
+    results = []
+    with ThreadPoolExecutor(max_workers=len(speeds)) as executor:
+        for speed, (ok, lines) in zip(speeds, executor.map(synthesize, speeds)):
+            print("\n".join(lines))
+            results.append((speed, ok))
     
     print(f"\n{'='*60}")
     print("📊 语速测试结果汇总:")
@@ -227,6 +259,8 @@ def main():
     print(f"\n✅ API Key已配置: {API_KEY[:10]}...")
     print(f"📁 输出目录: {OUTPUT_DIR}")
     
+    _warm_up()
+    
     # 测试菜单
     print("\n" + "="*60)
     print("请选择测试项目:")
@@ -2,22 +2,31 @@
 硅基流动 Vision API 本地测试脚本
 支持多种视觉模型和图像分析功能
 基于官方文档：https://docs.siliconflow.cn/cn/userguide/capabilities/multimodal-vision
+
+性能说明：瓶颈是网络I/O（TLS、请求往返）以及标准库C实现的Base64/orjson，
+脚本里没有可供 numba 等JIT加速的数值循环；优化方向是连接复用、并发请求和减少拷贝。
 """
 import requests
+from concurrent.futures import ThreadPoolExecutor
 import os
 import base64
+import orjson
+import mmap
+from functools import lru_cache
 from pathlib import Path
-from dotenv import load_dotenv
 import time
+from dataclasses import dataclass, field
+from typing import Optional
+import sys
 
-# 加载环境变量
-load_dotenv()
+from _http import API_KEY, BASE_URL, HEADERS as _HEADERS, SESSION as _SESSION, warm_up as _warm_up
 
 # 配置
-API_KEY = os.getenv("SILICONFLOW_API_KEY", "")
-BASE_URL = "https://api.siliconflow.cn/v1"
 OUTPUT_DIR = "../outputs/images"
 
+# 本地图片大小上限（Base64后约再增大1/3，过大的图片请求容易被拒绝或超时）
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
 # 确保输出目录存在
 Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
 
@@ -36,14 +45,80 @@ def encode_image_to_base64(image_path: str) -> str:
     """
     将本地图片编码为Base64
     
+    同一文件在一次运行中只编码一次；文件修改后（mtime/大小变化）自动重新编码
+    
     Args:
         image_path: 图片文件路径
         
     Returns:
         str: Base64编码的图片数据
+        
+    Raises:
+        FileNotFoundError: 文件不存在
+        ValueError: 文件超过 MAX_IMAGE_BYTES
     """
+    stat = os.stat(image_path)
+    if stat.st_size > MAX_IMAGE_BYTES:
+        raise ValueError(f"图片过大: {stat.st_size / 1024 / 1024:.1f}MB（上限 {MAX_IMAGE_BYTES // 1024 // 1024}MB）")
+    return _encode_cached(image_path, stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=32)
+def _encode_cached(image_path: str, mtime_ns: int, size: int) -> str:
+    """按 (路径, mtime, 大小) 缓存的Base64编码"""
+    if size == 0:
+        return ""
     with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+        # 直接对文件映射做编码，省去 read() 产生的整份文件拷贝
+        with mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return base64.b64encode(mm).decode('ascii')
+
+
+def classify_source(source: str) -> str:
+    """判断图片来源类型：url / file / missing（本地路径只做一次 stat）"""
+    if source.startswith(('http://', 'https://')):
+        return "url"
+    try:
+        os.stat(source)
+    except OSError:
+        return "missing"
+    return "file"
+
+
+def _short(text: str, n: int = 80) -> str:
+    """截断过长的URL/路径再写入日志（Data URL可能有数MB）"""
+    return text[:n] + ("..." if len(text) > n else "")
+
+
+def sniff_mime(head: bytes) -> str:
+    """根据文件头（魔数）判断图片MIME类型，无法识别时按JPEG处理"""
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"GIF8"):
+        return "image/gif"
+    return "image/jpeg"
+
+
+def image_to_data_url(image_path: str) -> str:
+    """将本地图片转换为Data URL，MIME类型按实际图片格式填写"""
+    base64_image = encode_image_to_base64(image_path)
+    # 前24个Base64字符正好解码出文件头18字节，不必再读一次文件
+    mime = sniff_mime(base64.b64decode(base64_image[:24]))
+    return f"data:{mime};base64,{base64_image}"
+
+
+@dataclass
+class VisionResult:
+    """单次图像识别测试的结果，保留回复内容以便复用，不必为其他指标重新请求"""
+    ok: bool
+    status: int = 0                 # HTTP状态码，请求未发出时为0
+    elapsed_s: float = 0.0
+    content: Optional[str] = None
+    usage: dict = field(default_factory=dict)
 
 
 def test_vision_analysis(
@@ -51,8 +126,10 @@ def test_vision_analysis(
     question: str = "请详细描述这张图片的内容",
     model: str = "Qwen/Qwen2-VL-7B-Instruct",
     detail: str = "auto",
-    use_base64: bool = False
-):
+    use_base64: bool = False,
+    quiet: bool = False,
+    _kind: Optional[str] = None
+) -> "VisionResult":
     """
     测试图像识别API
     
@@ -62,57 +139,83 @@ def test_vision_analysis(
         model: 视觉模型名称
         detail: 分析详细程度 (auto/low/high)
         use_base64: 是否使用Base64编码（对本地图片）
+        quiet: 不输出过程日志（批量运行时只看返回结果）
+        _kind: classify_source() 的结果，调用方已判断过时传入以免重复检查
         
     Returns:
-        bool: 是否成功
+        VisionResult: 是否成功、状态码、耗时、回复内容和token用量
     """
-    print(f"\n{'='*70}")
-    print(f"🖼️  图像识别测试")
-    print(f"{'='*70}")
-    print(f"📝 模型: {model}")
-    print(f"🎨 图片: {image_source}")
-    print(f"💬 提问: {question}")
-    print(f"🔍 详细度: {detail}")
-    print(f"{'='*70}")
+    # 输出先缓冲再按阶段整块写出，并发执行多个用例时各自的日志不会逐行穿插
+    lines = []
+    try:
+        return _run_vision_analysis(lines, image_source, question, model, detail, use_base64, quiet, _kind)
+    finally:
+        _flush(lines)
+
+
+def _flush(lines: list):
+    """一次性写出缓冲的多行输出并清空缓冲"""
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+        lines.clear()
+
+
+def _run_vision_analysis(
+    lines: list,
+    image_source: str,
+    question: str,
+    model: str,
+    detail: str,
+    use_base64: bool,
+    quiet: bool,
+    _kind: Optional[str]
+) -> "VisionResult":
+    """test_vision_analysis 的实际实现，输出追加到 lines 中（quiet 时不输出）"""
+    emit = (lambda line: None) if quiet else lines.append
+    emit(f"\n{'='*70}")
+    emit(f"🖼️  图像识别测试")
+    emit(f"{'='*70}")
+    emit(f"📝 模型: {model}")
+    emit(f"🎨 图片: {_short(image_source)}")
+    emit(f"💬 提问: {question}")
+    emit(f"🔍 详细度: {detail}")
+    emit(f"{'='*70}")
     
     # 检查API Key
     if not API_KEY or API_KEY == "your_api_key_here":
-        print("❌ 错误: API Key未配置！")
-        print("请在 .env 文件中设置 SILICONFLOW_API_KEY")
-        print("获取地址: https://cloud.siliconflow.cn/account/ak")
-        return False
+        emit("❌ 错误: API Key未配置！")
+        emit("请在 .env 文件中设置 SILICONFLOW_API_KEY")
+        emit("获取地址: https://cloud.siliconflow.cn/account/ak")
+        return VisionResult(False)
     
-    # 处理图片URL
-    if image_source.startswith(('http://', 'https://')):
+    # 处理图片URL（调用方已判断过来源类型时直接复用）
+    kind = _kind or classify_source(image_source)
+    if kind == "url":
         # 网络图片直接使用URL
         image_url = image_source
-        print(f"📡 使用网络图片: {image_url[:60]}...")
+        emit(f"📡 使用网络图片: {_short(image_url)}")
     else:
         # 本地图片
-        if not os.path.exists(image_source):
-            print(f"❌ 错误: 图片文件不存在: {image_source}")
-            return False
+        if kind == "missing":
+            emit(f"❌ 错误: 图片文件不存在: {image_source}")
+            return VisionResult(False)
         
         if use_base64:
             # 使用Base64编码
             try:
-                base64_image = encode_image_to_base64(image_source)
-                image_url = f"data:image/jpeg;base64,{base64_image}"
-                print(f"📦 使用Base64编码 (长度: {len(base64_image)} 字符)")
+                image_url = image_to_data_url(image_source)
+                emit(f"📦 使用Base64编码 (长度: {len(image_url)} 字符)")
             except Exception as e:
-                print(f"❌ Base64编码失败: {str(e)}")
-                return False
+                emit(f"❌ Base64编码失败: {str(e)}")
+                return VisionResult(False)
         else:
-            print("⚠️  注意: 本地图片需要使用Base64编码或上传到网络")
-            print("提示: 设置 use_base64=True 自动转换")
-            return False
+            emit("⚠️  注意: 本地图片需要使用Base64编码或上传到网络")
+            emit("提示: 设置 use_base64=True 自动转换")
+            return VisionResult(False)
     
     # 构建请求（根据官方文档格式）
     url = f"{BASE_URL}/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
     
     # 构建消息内容（多模态格式）
     data = {
@@ -139,27 +242,30 @@ def test_vision_analysis(
         "temperature": 0.7
     }
     
-    print(f"\n📤 发送请求到: {url}")
-    print(f"📦 模型: {model}")
-    print(f"🔧 详细度: {detail}")
+    emit(f"\n📤 发送请求到: {url}")
+    emit(f"📦 模型: {model}")
+    emit(f"🔧 详细度: {detail}")
     
     try:
+        # 请求前先输出已缓冲的内容，等待期间能看到进度
+        _flush(lines)
+        
         # 发送POST请求
-        start_time = time.time()
-        response = requests.post(
+        start_time = time.perf_counter()
+        response = _SESSION.post(
             url,
-            headers=headers,
-            json=data,
+            headers=_HEADERS,
+            data=orjson.dumps(data),
             timeout=60
         )
-        elapsed_time = time.time() - start_time
+        elapsed_time = time.perf_counter() - start_time
         
-        print(f"\n⏱️  响应时间: {elapsed_time:.2f}秒")
-        print(f"📊 状态码: {response.status_code}")
+        emit(f"\n⏱️  响应时间: {elapsed_time:.2f}秒")
+        emit(f"📊 状态码: {response.status_code}")
         
         # 检查响应
         if response.status_code == 200:
-            result = response.json()
+            result = orjson.loads(response.content)
             
             # 提取回复内容
             content = result['choices'][0]['message']['content']
@@ -170,52 +276,52 @@ def test_vision_analysis(
             completion_tokens = usage.get('completion_tokens', 0)
             total_tokens = usage.get('total_tokens', 0)
             
-            print(f"\n{'='*70}")
-            print(f"✅ 分析成功!")
-            print(f"{'='*70}")
-            print(f"\n🤖 AI 回复:\n")
-            print(content)
-            print(f"\n{'='*70}")
-            print(f"📊 Token使用统计:")
-            print(f"   - 输入 Tokens: {prompt_tokens}")
-            print(f"   - 输出 Tokens: {completion_tokens}")
-            print(f"   - 总计 Tokens: {total_tokens}")
-            print(f"{'='*70}")
+            emit(f"\n{'='*70}")
+            emit(f"✅ 分析成功!")
+            emit(f"{'='*70}")
+            emit(f"\n🤖 AI 回复:\n")
+            emit(content)
+            emit(f"\n{'='*70}")
+            emit(f"📊 Token使用统计:")
+            emit(f"   - 输入 Tokens: {prompt_tokens}")
+            emit(f"   - 输出 Tokens: {completion_tokens}")
+            emit(f"   - 总计 Tokens: {total_tokens}")
+            emit(f"{'='*70}")
             
-            return True
+            return VisionResult(True, response.status_code, elapsed_time, content, usage)
             
         elif response.status_code == 403:
-            print(f"\n❌ 403 Forbidden - 权限错误")
-            print(f"可能原因:")
-            print(f"  1. API Key 没有访问该模型的权限")
-            print(f"  2. 当前模型需要特殊权限")
-            print(f"\n建议:")
-            print(f"  1. 检查 API Key 权限: https://cloud.siliconflow.cn/account/ak")
-            print(f"  2. 尝试其他模型: Qwen/Qwen2-VL-7B-Instruct")
-            print(f"  3. 运行诊断脚本: python test_vision_api.py")
-            return False
+            emit(f"\n❌ 403 Forbidden - 权限错误")
+            emit(f"可能原因:")
+            emit(f"  1. API Key 没有访问该模型的权限")
+            emit(f"  2. 当前模型需要特殊权限")
+            emit(f"\n建议:")
+            emit(f"  1. 检查 API Key 权限: https://cloud.siliconflow.cn/account/ak")
+            emit(f"  2. 尝试其他模型: Qwen/Qwen2-VL-7B-Instruct")
+            emit(f"  3. 运行诊断脚本: python test_vision_api.py")
+            return VisionResult(False, response.status_code, elapsed_time)
             
         elif response.status_code == 404:
-            print(f"\n❌ 404 Not Found - 模型不存在")
-            print(f"模型名称可能不正确: {model}")
-            print(f"\n支持的模型列表:")
+            emit(f"\n❌ 404 Not Found - 模型不存在")
+            emit(f"模型名称可能不正确: {model}")
+            emit(f"\n支持的模型列表:")
             for key, value in SUPPORTED_MODELS.items():
-                print(f"  - {value}")
-            return False
+                emit(f"  - {value}")
+            return VisionResult(False, response.status_code, elapsed_time)
             
         else:
-            print(f"\n❌ 请求失败: {response.status_code}")
-            print(f"错误信息: {response.text}")
-            return False
+            emit(f"\n❌ 请求失败: {response.status_code}")
+            emit(f"错误信息: {response.text}")
+            return VisionResult(False, response.status_code, elapsed_time)
             
     except requests.exceptions.Timeout:
-        print("\n❌ 请求超时")
-        print("建议: 检查网络连接或增加超时时间")
-        return False
+        emit("\n❌ 请求超时")
+        emit("建议: 检查网络连接或增加超时时间")
+        return VisionResult(False)
         
     except Exception as e:
-        print(f"\n❌ 发生错误: {str(e)}")
-        return False
+        emit(f"\n❌ 发生错误: {str(e)}")
+        return VisionResult(False)
 
 
 def test_multi_image_comparison(
@@ -240,28 +346,19 @@ def test_multi_image_comparison(
     print(f"🖼️🖼️  多图对比测试")
     print(f"{'='*70}")
     
-    # 检查图片是否存在
-    if not os.path.exists(image1_path):
-        print(f"❌ 图片1不存在: {image1_path}")
-        return False
-    if not os.path.exists(image2_path):
-        print(f"❌ 图片2不存在: {image2_path}")
-        return False
-    
-    # 编码图片
+    # 编码图片（编码时的 stat 同时完成存在性和大小检查）
     try:
-        base64_image1 = encode_image_to_base64(image1_path)
-        base64_image2 = encode_image_to_base64(image2_path)
+        image_url1 = image_to_data_url(image1_path)
+        image_url2 = image_to_data_url(image2_path)
+    except FileNotFoundError as e:
+        print(f"❌ 图片不存在: {e.filename}")
+        return False
     except Exception as e:
         print(f"❌ 图片编码失败: {str(e)}")
         return False
     
     # 构建请求
     url = f"{BASE_URL}/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
     
     data = {
         "model": model,
@@ -272,13 +369,13 @@ def test_multi_image_comparison(
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image1}"
+                            "url": image_url1
                         }
                     },
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image2}"
+                            "url": image_url2
                         }
                     },
                     {
@@ -297,12 +394,12 @@ def test_multi_image_comparison(
     print(f"💬 提问: {question}")
     
     try:
-        start_time = time.time()
-        response = requests.post(url, headers=headers, json=data, timeout=60)
-        elapsed_time = time.time() - start_time
+        start_time = time.perf_counter()
+        response = _SESSION.post(url, headers=_HEADERS, data=orjson.dumps(data), timeout=60)
+        elapsed_time = time.perf_counter() - start_time
         
         if response.status_code == 200:
-            result = response.json()
+            result = orjson.loads(response.content)
             content = result['choices'][0]['message']['content']
             
             print(f"\n✅ 对比成功! (耗时: {elapsed_time:.2f}秒)")
@@ -343,32 +440,34 @@ def run_all_tests():
         },
     ]
     
-    results = []
+    def run(test):
+        # 用例标题与识别过程写入同一个缓冲，按阶段整块输出
+        lines = [f"\n{'='*70}", f"🧪 {test['name']}", f"{'='*70}"]
+        try:
+            # 跳过不存在的本地图片
+            kind = classify_source(test['image'])
+            if kind == "missing":
+                lines.append(f"⚠️  跳过测试: 图片不存在 ({test['image']})")
+                lines.append(f"💡 提示: 在 outputs/images/ 目录放置测试图片")
+                return False
+            
+            return _run_vision_analysis(
+                lines,
+                test['image'],
+                test['question'],
+                test['model'],
+                "auto",
+                test.get('use_base64', False),
+                False,
+                kind
+            ).ok
+        finally:
+            _flush(lines)
     
-    for i, test in enumerate(test_cases, 1):
-        print(f"\n{'='*70}")
-        print(f"🧪 {test['name']}")
-        print(f"{'='*70}")
-        
-        # 跳过不存在的本地图片
-        if not test['image'].startswith('http') and not os.path.exists(test['image']):
-            print(f"⚠️  跳过测试: 图片不存在 ({test['image']})")
-            print(f"💡 提示: 在 outputs/images/ 目录放置测试图片")
-            results.append(False)
-            continue
-        
-        success = test_vision_analysis(
-            image_source=test['image'],
-            question=test['question'],
-            model=test['model'],
-            use_base64=test.get('use_base64', False)
-        )
-        results.append(success)
-        
-        # 每次测试间隔
-        if i < len(test_cases):
-            print(f"\n⏳ 等待2秒...")
-            time.sleep(2)
+    # 各用例互不依赖，并发执行（共用 _SESSION 的连接池），
+    # 总耗时约等于最慢的一个用例
+    with ThreadPoolExecutor(max_workers=len(test_cases)) as executor:
+        results = list(executor.map(run, test_cases))
     
     # 总结
     print(f"\n{'='*70}")
@@ -429,8 +528,6 @@ def interactive_test():
 
 
 if __name__ == "__main__":
-    import sys
-    
     print("\n" + "="*70)
     print("🖼️  硅基流动图像识别 API 测试工具")
     print("="*70)
@@ -439,6 +536,8 @@ if __name__ == "__main__":
     print("  2. python test_vision_local.py interactive  # 交互式测试")
     print("  3. python test_vision_local.py <image_url>  # 快速测试指定图片")
     
+    _warm_up()
+    
     if len(sys.argv) > 1:
         if sys.argv[1] == "interactive":
             interactive_test()
@@ -1,18 +1,74 @@
 """
 测试图像识别 API 并诊断 403 错误
+
+性能说明：耗时几乎全在网络往返上（没有数值计算循环，不适合用 numba 之类的JIT），
+因此只做了连接复用（settings.http）和多模型并发探测。
 """
 import requests
+import orjson
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
 from config.settings import settings
 from loguru import logger
 import sys
+import time
+import hashlib
+from pathlib import Path
 
 logger.remove()
 logger.add(sys.stdout, level="INFO")
 
+# 模型探测结果缓存（24小时内重复运行直接读取，不再逐个请求）
+PROBE_CACHE_PATH = Path.home() / ".cache" / "llmdemo" / "vlm_probe.json"
+PROBE_CACHE_TTL = 24 * 3600
+
+# fail-fast 模式的并发探测数：按推荐顺序逐个补充，找到可用模型后不再发起新的请求
+FAIL_FAST_WORKERS = 2
+
+# 复用项目共享的连接池会话，逐个探测模型时不必每次重新建立TCP+TLS连接
+http = settings.http
+
+
+def _probe_cache_key() -> str:
+    """探测缓存按API Key区分（只保存哈希，不落盘Key本身）"""
+    return hashlib.sha256(settings.SILICONFLOW_API_KEY.encode()).hexdigest()[:16]
+
+
+def _load_probe_cache(vlm_models):
+    """读取未过期且模型列表一致的探测结果，没有可用缓存时返回 None"""
+    try:
+        entry = orjson.loads(PROBE_CACHE_PATH.read_bytes())[_probe_cache_key()]
+    except (OSError, ValueError, KeyError):
+        return None
+    if time.time() - entry["time"] > PROBE_CACHE_TTL or entry["models"] != vlm_models:
+        return None
+    return [tuple(item) for item in entry["results"]]
+
+
+def _save_probe_cache(vlm_models, results):
+    """保存探测结果；有请求超时/出错时不缓存，避免把偶发故障记住一整天"""
+    if any(status_code is None for _, status_code, _ in results):
+        return
+    try:
+        data = orjson.loads(PROBE_CACHE_PATH.read_bytes())
+    except (OSError, ValueError):
+        data = {}
+    data[_probe_cache_key()] = {"time": time.time(), "models": vlm_models, "results": results}
+    
+    PROBE_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = PROBE_CACHE_PATH.with_suffix(".tmp")
+    tmp_path.write_bytes(orjson.dumps(data))
+    tmp_path.replace(PROBE_CACHE_PATH)
+
 
-def test_available_vlm_models():
+def test_available_vlm_models(refresh: bool = False, fail_fast: bool = False):
     """
     测试可用的 VLM 模型列表
+    
+    Args:
+        refresh: 忽略缓存，强制重新探测
+        fail_fast: 限制并发、按推荐顺序依次探测，找到第一个可用模型后不再发起新的探测
+                   （已发出的请求仍会等其返回）
     """
     print("=" * 70)
     print("🔍 硅基流动 - 图像识别模型测试")
@@ -65,34 +121,61 @@ def test_available_vlm_models():
     print("开始测试各个模型的可用性...")
     print("=" * 70 + "\n")
     
-    for model_name in vlm_models:
-        test_message["model"] = model_name
-        
+    def probe(model_name):
+        """探测单个模型，返回 (模型名, 状态码, 响应摘要)；请求异常时状态码为 None"""
         try:
-            print(f"🧪 测试模型: {model_name}")
-            response = requests.post(
+            response = http.post(
                 url,
-                json=test_message,
+                data=orjson.dumps({**test_message, "model": model_name}),
                 headers=headers,
                 timeout=30
             )
-            
-            if response.status_code == 200:
-                print(f"   ✅ 可用！")
-                available_models.append(model_name)
-            elif response.status_code == 403:
-                print(f"   ❌ 403 - 无权限访问")
-            elif response.status_code == 404:
-                print(f"   ⚠️  404 - 模型不存在")
-            elif response.status_code == 401:
-                print(f"   ❌ 401 - API Key 无效")
-            else:
-                print(f"   ⚠️  {response.status_code} - {response.text[:100]}")
-                
+            return model_name, response.status_code, response.text[:100]
         except requests.exceptions.Timeout:
-            print(f"   ⏱️  超时（可能可用，但响应慢）")
+            return model_name, None, "⏱️  超时（可能可用，但响应慢）"
         except Exception as e:
-            print(f"   ❌ 错误: {str(e)[:50]}")
+            return model_name, None, f"❌ 错误: {str(e)[:50]}"
+    
+    cached = None if refresh else _load_probe_cache(vlm_models)
+    if cached is not None:
+        print("💾 使用24小时内的探测结果（加 --refresh 参数重新探测）\n")
+        results = cached
+    else:
+        # 各模型的探测请求互不依赖，并发发出；全部完成后再按顺序输出，避免日志交错。
+        # 探测是按需提交的：每完成一个再补一个，fail_fast 找到可用模型后就不再提交
+        workers = FAIL_FAST_WORKERS if fail_fast else len(vlm_models)
+        remaining = iter(vlm_models)
+        done = {}
+        found = False
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            running = {executor.submit(probe, m) for m in islice(remaining, workers)}
+            while running:
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    model_name, status_code, detail = future.result()
+                    done[model_name] = (model_name, status_code, detail)
+                    found = found or (fail_fast and status_code == 200)
+                if not found:
+                    running |= {executor.submit(probe, m) for m in islice(remaining, len(finished))}
+        results = [done.get(m, (m, None, "⏭️  已跳过（已找到可用模型）")) for m in vlm_models]
+        _save_probe_cache(vlm_models, results)
+    
+    for model_name, status_code, detail in results:
+        print(f"🧪 测试模型: {model_name}")
+        
+        if status_code is None:
+            print(f"   {detail}")
+        elif status_code == 200:
+            print(f"   ✅ 可用！")
+            available_models.append(model_name)
+        elif status_code == 403:
+            print(f"   ❌ 403 - 无权限访问")
+        elif status_code == 404:
+            print(f"   ⚠️  404 - 模型不存在")
+        elif status_code == 401:
+            print(f"   ❌ 401 - API Key 无效")
+        else:
+            print(f"   ⚠️  {status_code} - {detail}")
         
         print()
     
@@ -146,12 +229,12 @@ def test_simple_text_api():
             "max_tokens": 50
         }
         
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
+        response = http.post(url, data=orjson.dumps(payload), headers=headers, timeout=30)
         
         if response.status_code == 200:
             print("✅ 文本 API 正常工作 - API Key 有效")
             print(f"   模型: {settings.TEXT_MODEL}")
-            result = response.json()
+            result = orjson.loads(response.content)
             reply = result["choices"][0]["message"]["content"]
             print(f"   回复: {reply[:50]}...")
         else:
@@ -169,11 +252,17 @@ if __name__ == "__main__":
         # 验证配置
         settings.validate()
         
+        # 预热连接，后续探测请求不再承担首次TLS握手
+        settings.warm_up_http()
+        
         # 测试文本 API（对比）
         test_simple_text_api()
         
         # 测试 VLM 模型
-        available_models = test_available_vlm_models()
+        available_models = test_available_vlm_models(
+            refresh="--refresh" in sys.argv,
+            fail_fast="--fail-fast" in sys.argv
+        )
         
         print("\n" + "=" * 70)
         print("✨ 测试完成！")